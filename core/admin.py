@@ -6,8 +6,8 @@ from django.utils.translation import ugettext_lazy as _
 from rest_framework.authtoken.admin import TokenAdmin
 
 from .models import (
-    Colaborator, Company, Event, Invite, Link, Message, Notification, Role,
-    User
+    Colaborator, Company, Event, Invite, Job, JobChunk, Link, Message,
+    Notification, Role, User
 )
 
 
@@ -28,6 +28,13 @@ class ColaboratorInline(admin.TabularInline):
     model = Colaborator
 
 
+class JobChunkInline(admin.TabularInline):
+    extra = 0
+    fields = ('index', 'date_finish', 'date_fail', 'error', )
+    model = JobChunk
+    readonly_fields = ('index', 'date_finish', 'date_fail', 'error', )
+
+
 class LinkInline(admin.TabularInline):
     extra = 0
     model = Link
@@ -74,6 +81,17 @@ class InviteAdmin(CompanyAdminMixin):
     search_fields = ('id', )
 
 
+@admin.register(Job)
+class JobAdmin(CompanyAdminMixin):
+    inlines = (
+        JobChunkInline,
+    )
+    list_display = (
+        '__str__', 'company', 'date_creation', 'chunks_done', 'chunks_failed',
+        'chunks_total', 'date_finish',
+    )
+
+
 @admin.register(Link)
 class LinkModelAdmin(CompanyAdminMixin):
     list_display = ('destination', 'message', 'user')
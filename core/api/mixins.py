@@ -1,8 +1,14 @@
 from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+
+from core.constants import EXPORT_CHUNK_SIZE
+from core.shortcuts import get_current_colaborator
+from core.utils import stream_csv, stream_jsonl
 
 
 class CompanyCreateMixin:
@@ -86,6 +92,8 @@ class CompanyReadOnlyViewSet(
     def initial(self, request, *args, **kwargs):
         super().initial(request, *args, **kwargs)
 
+        if not get_current_colaborator(request):
+            return self.handle_no_permission()
         if not self.request.company.is_active:
             return self.handle_no_permission()
 
@@ -144,6 +152,56 @@ class CompanyViewSet(
         return super().destroy(request, *args, **kwargs)
 
 
+class ExportMixin:
+    """
+    Stream the filtered queryset as CSV or JSON lines without pagination.
+    """
+    export_chunk_size = EXPORT_CHUNK_SIZE
+    export_fields = None
+    export_formats = {
+        'csv': ('text/csv', stream_csv),
+        'jsonl': ('application/x-ndjson', stream_jsonl),
+    }
+
+    def get_export_fields(self):
+        if self.export_fields:
+            return self.export_fields
+        return tuple(
+            field.attname for field in self.model._meta.concrete_fields
+        )
+
+    @action(
+        methods=['get'], detail=False,
+        url_path=r'export/(?P<export_format>csv|jsonl)'
+    )
+    def export(self, request, export_format, *args, **kwargs):
+        permission_name = self.get_permission_name('view')
+
+        if (
+            not self.get_bypass_permissions() and
+            not request.user.has_company_perm(
+                self.request.company, permission_name
+            )
+        ):
+            return self.handle_no_permission()
+
+        content_type, stream = self.export_formats[export_format]
+        fields = self.get_export_fields()
+        rows = self.filter_queryset(self.get_queryset()).values_list(
+            *fields
+        ).iterator(chunk_size=self.export_chunk_size)
+
+        response = StreamingHttpResponse(
+            stream(fields, rows), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="{}.{}"'.format(
+                self.model._meta.model_name, export_format
+            )
+        )
+        return response
+
+
 class NestedReadOnlyViewset(CompanyReadOnlyViewSet):
     parent = None
     parent_company_field = 'company'
@@ -0,0 +1,132 @@
+import base64
+from collections import OrderedDict
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over ``(date_creation, id)``, newest first.
+
+    Pages are fetched with a range condition on the composite key instead of
+    an OFFSET, so deep pages cost the same as the first one. The total count
+    is only computed when the view sets ``pagination_count = True``.
+    """
+    cursor_query_param = 'cursor'
+    include_count = False
+    invalid_cursor_message = _("Invalid cursor")
+    max_page_size = 1000
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+
+        if encoded is None:
+            return None
+
+        try:
+            date, pk, reverse = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii')).decode()
+            )
+            date = parse_datetime(date)
+            pk = model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if date is None or pk is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return date, pk, bool(reverse)
+
+    def encode_cursor(self, obj, reverse):
+        cursor = json.dumps(
+            [obj.date_creation.isoformat(), str(obj.pk), reverse]
+        )
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            base64.urlsafe_b64encode(cursor.encode()).decode('ascii')
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.count = None
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, queryset.model)
+
+        if getattr(view, 'pagination_count', self.include_count):
+            self.count = queryset.count()
+
+        if cursor is None:
+            reverse = False
+            qs = queryset.order_by('-date_creation', '-pk')
+        else:
+            date, pk, reverse = cursor
+            if reverse:
+                qs = queryset.filter(
+                    Q(date_creation__gt=date) |
+                    Q(date_creation=date, pk__gt=pk)
+                ).order_by('date_creation', 'pk')
+            else:
+                qs = queryset.filter(
+                    Q(date_creation__lt=date) |
+                    Q(date_creation=date, pk__lt=pk)
+                ).order_by('-date_creation', '-pk')
+
+        results = list(qs[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.results = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.results:
+            return None
+        return self.encode_cursor(self.results[-1], False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.results:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.results[0], True)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+
+        if self.count is not None:
+            response['count'] = self.count
+
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
@@ -1,9 +1,6 @@
-from django.urls import reverse_lazy
-from django.utils.translation import ugettext_lazy as _
-
 from rest_framework import serializers
 
-from core.constants import ACTIONS
+from core.routes import get_action_details, reverse_action
 
 
 class ActionSerializer(serializers.ModelSerializer):
@@ -12,45 +9,29 @@ class ActionSerializer(serializers.ModelSerializer):
 
     def get_action_list(self, object):
         action_list = {'view': dict(
-            title=_("View"),
+            get_action_details('view'),
             url=object.get_absolute_url(),
-            btn_class='info',
-            btn_icon='eye-open',
             visible=False,
         )}
 
         if not hasattr(object, 'action_list') or not object.action_list:
             return action_list
 
-        for action in object.action_list:
-            action_details = ACTIONS[action]
-            app_name = object._meta.app_label
-            app_name = app_name if app_name != 'core' else 'panel'
-            args = []
-            model = object.__class__.__name__.lower()
-            parent = None
-
-            if hasattr(object, 'parent') and object.parent:
-                parent = object.parent.__class__.__name__.lower()
-                args += [object.parent.pk]
-                url_name = '{app_name}:{parent}_{model}_{action}'
-            else:
-                url_name = '{app_name}:{model}_{action}'
-            args += [object.pk]
-
-            url_name = url_name.format(
-                app_name=app_name,
-                model=model,
-                parent=parent,
-                action=action,
-            )
-            url = reverse_lazy(url_name, args=args)
+        app_name = object._meta.app_label
+        app_name = app_name if app_name != 'core' else 'panel'
+        args = []
+        model = object.__class__.__name__.lower()
+        parent = None
 
+        if hasattr(object, 'parent') and object.parent:
+            parent = object.parent.__class__.__name__.lower()
+            args += [object.parent.pk]
+        args += [object.pk]
+
+        for action in object.action_list:
             action_list[action] = dict(
-                title=action_details['title'],
-                url=url,
-                btn_class=action_details['level'],
-                btn_icon=action_details['icon'],
+                get_action_details(action),
+                url=reverse_action(app_name, action, model, parent, args),
                 visible=True,
             )
         return action_list
@@ -0,0 +1,192 @@
+"""
+Cache helpers shared by the core models.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+from django.core.cache import cache
+
+
+class LocalCache:
+    """
+    In-process LRU cache bounded by size and time to live.
+    """
+
+    def __init__(self, maxsize=128, timeout=60):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, size=len(self))
+
+
+def get_version(key):
+    """
+    Return the version stamp stored under ``key`` in the shared cache.
+
+    Missing stamps are initialized with the current time in milliseconds so
+    an evicted stamp never comes back with a value seen before.
+    """
+    version = cache.get(key)
+
+    if version is None:
+        version = int(time.time() * 1000)
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_version(key):
+    """
+    Invalidate every entry stamped with the current version of ``key``.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(key)
+
+
+class CacheQueue:
+    """
+    FIFO queue kept in the shared cache.
+
+    Every push takes its own slot from an atomic counter, so producers never
+    contend on a shared value and any backend supporting ``incr`` will do.
+    Consumers are expected to serialize themselves, see ``lock``.
+    """
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.gaps_key = '{}.gaps'.format(name)
+        self.head_key = '{}.head'.format(name)
+        self.lock_key = '{}.lock'.format(name)
+        self.tail_key = '{}.tail'.format(name)
+
+    def __len__(self):
+        head, tail = self.get_bounds()
+        return tail - head
+
+    def get_item_key(self, index):
+        return '{}.{}'.format(self.name, index)
+
+    def get_bounds(self):
+        bounds = cache.get_many([self.head_key, self.tail_key])
+        head = bounds.get(self.head_key, 0)
+        tail = bounds.get(self.tail_key, 0)
+
+        # An evicted tail starts counting again from zero.
+        if tail < head:
+            head = 0
+
+        return head, tail
+
+    def push(self, item):
+        try:
+            index = cache.incr(self.tail_key)
+        except ValueError:
+            cache.add(self.tail_key, 0, None)
+            index = cache.incr(self.tail_key)
+
+        cache.set(self.get_item_key(index), item, self.timeout)
+        return index
+
+    def peek(self, count):
+        """
+        Return ``(position, items)`` with up to ``count`` of the oldest items.
+
+        Nothing is removed until ``ack(position)`` is called, so a consumer
+        failing halfway leaves the items for the next run.
+        """
+        head, tail = self.get_bounds()
+        indexes = range(head + 1, min(tail, head + count) + 1)
+        items = cache.get_many(
+            [self.get_item_key(index) for index in indexes]
+        ) if indexes else {}
+        gaps = set(cache.get(self.gaps_key) or ())
+        missing = []
+        position = head
+        found = []
+        blocked = False
+
+        for index in indexes:
+            key = self.get_item_key(index)
+
+            if key not in items:
+                missing.append(index)
+
+                # A producer takes its slot before writing the item, so a
+                # missing one is only skipped when it was already missing on
+                # the previous run, as an expired or evicted item.
+                if index not in gaps:
+                    blocked = True
+
+            if blocked:
+                continue
+
+            if key in items:
+                found.append(items[key])
+            position = index
+
+        cache.set(self.gaps_key, missing, None)
+        return position, found
+
+    def ack(self, position):
+        head, tail = self.get_bounds()
+        cache.set(self.head_key, position, None)
+        cache.delete_many([
+            self.get_item_key(index) for index in range(head + 1, position + 1)
+        ])
+
+    def lock(self, timeout):
+        """
+        Return whether the consumer lock was acquired for ``timeout``.
+        """
+        return cache.add(self.lock_key, True, timeout)
+
+    def unlock(self):
+        cache.delete(self.lock_key)
@@ -21,6 +21,12 @@ ACTIONS = {
         'icon': 'trash',
         'permission_prefix': 'delete',
     },
+    'delete_all': {
+        'title': _("Delete all"),
+        'level': 'danger',
+        'icon': 'trash',
+        'permission_prefix': 'delete',
+    },
     'permissions': {
         'title': _("Permissions"),
         'level': 'info',
@@ -33,6 +39,12 @@ ACTIONS = {
         'icon': 'envelope',
         'permission_prefix': 'send',
     },
+    'send_all': {
+        'title': _("Send pending"),
+        'level': 'info',
+        'icon': 'envelope',
+        'permission_prefix': 'send',
+    },
 }
 
 CICLE_DAY = 'day'
@@ -40,6 +52,12 @@ CICLE_WEEK = 'week'
 CICLE_MONTH = 'month'
 CICLE_YEAR = 'year'
 
+COMPANY_CACHE_SIZE = 256
+COMPANY_CACHE_TIMEOUT = 60
+COMPANY_CACHE_SHARED_TIMEOUT = 60 * 60
+COMPANY_MISS_CACHE_SIZE = 1024
+COMPANY_MISS_CACHE_TIMEOUT = 5 * 60
+
 DIRECTION_OUTBOUND = 'outbound'
 DIRECTION_INBOUND = 'inbound'
 
@@ -55,15 +73,22 @@ EVENT_CALL_COLOR = '#154360'
 EVENT_JOB_START_COLOR = '#0E6251'
 EVENT_PRIVATE_COLOR = '#145A32'
 
+EXPORT_CHUNK_SIZE = 2000
+
 GRACE_DAYS = 7
 
 HREF_REGEX = r'href=(["\'])(.*?)\1'
 
+JOB_CHUNK_MAX_RETRIES = 5
+JOB_CHUNK_SIZE = 500
+
 LEVEL_ERROR = 'error'
 LEVEL_INFO = 'info'
 LEVEL_SUCCESS = 'success'
 LEVEL_WARNING = 'warning'
 
+MESSAGE_BATCH_SIZE = 100
+
 # MODULE_CRM = 'crm'
 
 MODULE_LIST = (
@@ -73,20 +98,46 @@ MODULE_PRICE_LIST = (
     # (MODULE_CRM, 19),
 )
 
+NOTIFICATION_RECONCILE_BATCH_SIZE = 500
+NOTIFICATION_SUMMARY_THRESHOLD = 10
+NOTIFICATION_UNREAD_TIMEOUT = 60 * 60
+
 NOTIFY_0 = 0
 NOTIFY_10 = 10
 NOTIFY_30 = 30
 NOTIFY_60 = 60
 NOTIFY_1440 = 24
 
+PERMISSION_CACHE_SIZE = 128
+PERMISSION_CACHE_TIMEOUT = 60 * 60
+
+PIXEL_CACHE_TIMEOUT = 24 * 60 * 60
 PIXEL_GIF_DATA = """
 R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7
 """.strip()
 
+QUEUE_BULK = 'bulk'
+QUEUE_INTERACTIVE = 'interactive'
+QUEUE_LATENCY_TIMEOUT = 24 * 60 * 60
+QUEUE_REALTIME = 'realtime'
+QUEUE_LIST = (QUEUE_REALTIME, QUEUE_INTERACTIVE, QUEUE_BULK)
+
+REMINDER_BATCH_SIZE = 50
+REMINDER_LOCK_TIMEOUT = 10 * 60
+
 RECURRING_CICLE = CICLE_MONTH
 RECURRING_FEE = 50
 
+SUBJECT_TEMPLATE_CACHE_SIZE = 256
+SUBJECT_TEMPLATE_CACHE_TIMEOUT = 60 * 60
+
+TASK_LOCK_TIMEOUT = 5 * 60
+
 URL_REGEX = (
     r'(\(.*?)?\b((?:https?|ftp|file):\/\/'
     r'[-a-z0-9+&@#\/%?=~_()|!:,.;]*[-a-z0-9+&@#\/%=~_()|])'
 )
+
+VISIT_BATCH_SIZE = 500
+VISIT_BUFFER_TIMEOUT = 24 * 60 * 60
+VISIT_FLUSH_TIMEOUT = 5 * 60
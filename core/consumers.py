@@ -0,0 +1,85 @@
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import JsonWebsocketConsumer
+from channels.layers import get_channel_layer
+
+from core.models import Company
+
+
+def get_notification_group(user_id, company_id):
+    return 'notifications.{}.{}'.format(user_id, company_id)
+
+
+def publish_job(user_id, company_id, job):
+    """
+    Push the serialized progress of a ``job`` to the open sockets of a user.
+    """
+    channel_layer = get_channel_layer()
+
+    if channel_layer is None:
+        return
+
+    async_to_sync(channel_layer.group_send)(
+        get_notification_group(user_id, company_id), {
+            'type': 'job.progress',
+            'job': job,
+        }
+    )
+
+
+def publish_notifications(user_id, company_id, notifications):
+    """
+    Push serialized ``notifications`` to the open sockets of a user.
+    """
+    channel_layer = get_channel_layer()
+
+    if channel_layer is None or not notifications:
+        return
+
+    send = async_to_sync(channel_layer.group_send)
+    for notification in notifications:
+        send(get_notification_group(user_id, company_id), {
+            'type': 'notification.send',
+            'notification': notification,
+        })
+
+
+class NotificationConsumer(JsonWebsocketConsumer):
+    """
+    Deliver the notifications of the user in the company of the host.
+    """
+    group_name = None
+
+    def connect(self):
+        user = self.scope['user']
+        host = dict(self.scope['headers']).get(b'host', b'').decode('latin1')
+
+        try:
+            company = Company.objects.get_current(host=host)
+        except Company.DoesNotExist:
+            company = None
+
+        if (
+            not user.is_authenticated or
+            company is None or
+            not user.as_colaborator(company)
+        ):
+            self.close()
+            return
+
+        self.group_name = get_notification_group(user.pk, company.pk)
+        async_to_sync(self.channel_layer.group_add)(
+            self.group_name, self.channel_name
+        )
+        self.accept()
+
+    def disconnect(self, code):
+        if self.group_name:
+            async_to_sync(self.channel_layer.group_discard)(
+                self.group_name, self.channel_name
+            )
+
+    def job_progress(self, event):
+        self.send_json(dict(event['job'], type='job.progress'))
+
+    def notification_send(self, event):
+        self.send_json(event['notification'])
@@ -5,3 +5,18 @@ class MultipleChoiceField(forms.MultipleChoiceField):
     def clean(self, value):
         super().clean(value)
         return ','.join(value)
+
+
+class PermissionMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """
+    Permissions a company can grant, rendered from its cached choices.
+    """
+
+    def __init__(self, company, **kwargs):
+        self.company = company
+        super().__init__(queryset=company.permission_queryset, **kwargs)
+
+    def _get_choices(self):
+        return self.company.permission_choices
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
@@ -0,0 +1,202 @@
+"""
+Single pass processing of outbound message bodies.
+"""
+from html import escape, unescape
+from html.parser import HTMLParser
+import re
+
+from django.template.engine import Template
+
+from core.cache import LocalCache
+from core.constants import (
+    SUBJECT_TEMPLATE_CACHE_SIZE, SUBJECT_TEMPLATE_CACHE_TIMEOUT, URL_REGEX
+)
+
+
+BLOCK_TAGS = (
+    'address', 'blockquote', 'br', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'li', 'ol', 'p', 'pre', 'table', 'td', 'th', 'tr', 'ul'
+)
+HIDDEN_TAGS = ('head', 'script', 'style', 'title')
+LINK_PLACEHOLDER = '\x00{}\x00'
+LINK_PLACEHOLDER_REGEX = re.compile(r'\x00(\d+)\x00')
+LINK_TAGS = ('a', 'area')
+SUBJECT_TEMPLATE_CACHE = LocalCache(
+    maxsize=SUBJECT_TEMPLATE_CACHE_SIZE,
+    timeout=SUBJECT_TEMPLATE_CACHE_TIMEOUT,
+)
+TAG_REGEX = re.compile(r'<([a-z][a-z0-9]*)\b[^>]*>', re.IGNORECASE)
+TRACKABLE_REGEX = re.compile(r'^(?:https?|ftp)://', re.IGNORECASE)
+URL_RE = re.compile(URL_REGEX, re.IGNORECASE)
+
+
+def get_subject_template(source):
+    """
+    Return the compiled template of a subject line. Translations are looked
+    up when rendering, so one compiled template serves every language.
+    """
+    template = SUBJECT_TEMPLATE_CACHE.get(source)
+
+    if template is None:
+        template = Template(source)
+        SUBJECT_TEMPLATE_CACHE.set(source, template)
+
+    return template
+
+
+def is_html_content(content):
+    return bool(TAG_REGEX.search(content or ''))
+
+
+def is_trackable_url(url):
+    return bool(TRACKABLE_REGEX.match(url or ''))
+
+
+def clean_text(text):
+    lines = []
+
+    for line in text.split('\n'):
+        if line.strip():
+            lines.append(line.strip())
+
+    return '\n'.join(lines)
+
+
+def replace_link_placeholders(content, urls):
+    """
+    Swap the placeholders left by ``render_content`` for ``urls[index]``.
+    """
+    if not content:
+        return content
+    return LINK_PLACEHOLDER_REGEX.sub(
+        lambda match: urls[int(match.group(1))], content
+    )
+
+
+def rewrite_text_urls(text, rewrite_url):
+    def replace(match):
+        return (match.group(1) or '') + rewrite_url(match.group(2))
+
+    return URL_RE.sub(replace, text)
+
+
+class ContentParser(HTMLParser):
+    """
+    Re-emit an HTML document while rewriting link targets, appending a
+    tracking pixel to the body and collecting its plain text.
+    """
+
+    def __init__(self, rewrite_url=None, pixel_url=None):
+        super().__init__(convert_charrefs=False)
+        self.rewrite_url = rewrite_url
+        self.pixel_url = pixel_url
+        self.hidden = 0
+        self.html = []
+        self.text = []
+
+    def get_pixel(self):
+        if not self.pixel_url:
+            return ''
+        pixel_url = self.pixel_url
+        self.pixel_url = None
+        return '<img alt="x" height="1px" src="{}" width="1px" />'.format(
+            escape(pixel_url)
+        )
+
+    def get_starttag(self, tag, attrs, closed=False):
+        if (
+            self.rewrite_url is None or
+            tag not in LINK_TAGS or
+            not any(
+                name == 'href' and is_trackable_url(value)
+                for name, value in attrs
+            )
+        ):
+            return self.get_starttag_text()
+
+        html = '<' + tag
+        for name, value in attrs:
+            if name == 'href' and is_trackable_url(value):
+                value = self.rewrite_url(value)
+            if value is None:
+                html += ' ' + name
+            else:
+                html += ' {}="{}"'.format(name, escape(value))
+        return html + (' />' if closed else '>')
+
+    def handle_starttag(self, tag, attrs):
+        if tag in HIDDEN_TAGS:
+            self.hidden += 1
+        elif tag in BLOCK_TAGS:
+            self.text.append('\n')
+        self.html.append(self.get_starttag(tag, attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        self.html.append(self.get_starttag(tag, attrs, closed=True))
+
+    def handle_endtag(self, tag):
+        if tag in HIDDEN_TAGS:
+            self.hidden = max(self.hidden - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.text.append('\n')
+        elif tag == 'body':
+            self.html.append(self.get_pixel())
+        self.html.append('</{}>'.format(tag))
+
+    def handle_data(self, data):
+        self.html.append(data)
+        if not self.hidden:
+            self.text.append(data)
+
+    def handle_entityref(self, name):
+        self.html.append('&{};'.format(name))
+        if not self.hidden:
+            self.text.append(unescape('&{};'.format(name)))
+
+    def handle_charref(self, name):
+        self.html.append('&#{};'.format(name))
+        if not self.hidden:
+            self.text.append(unescape('&#{};'.format(name)))
+
+    def handle_comment(self, data):
+        self.html.append('<!--{}-->'.format(data))
+
+    def handle_decl(self, decl):
+        self.html.append('<!{}>'.format(decl))
+
+    def handle_pi(self, data):
+        self.html.append('<?{}>'.format(data))
+
+    def unknown_decl(self, data):
+        self.html.append('<![{}]>'.format(data))
+
+    def close(self):
+        super().close()
+        self.html.append(self.get_pixel())
+
+
+def render_content(content, is_html, rewrite_url=None, pixel_url=None):
+    """
+    Return the ``(content_raw, content_html)`` pair of a message body.
+
+    HTML bodies are parsed once: links are rewritten, the pixel is added and
+    the plain text alternative is collected in the same pass.
+    """
+    content = content or ''
+
+    if not is_html:
+        if rewrite_url is not None:
+            content = rewrite_text_urls(content, rewrite_url)
+        return content, None
+
+    parser = ContentParser(rewrite_url, pixel_url)
+    parser.feed(content)
+    parser.close()
+
+    content_raw = clean_text(''.join(parser.text))
+    if rewrite_url is not None:
+        content_raw = rewrite_text_urls(content_raw, rewrite_url)
+
+    return content_raw, ''.join(parser.html)
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+from core.constants import PIXEL_GIF_DATA
+from core.models import Company, Message
+from public.views import MessagePixelView
+
+
+def legacy_pixel_view(request, pk):
+    message = Message.objects.get(pk=pk)
+    message.set_read()
+    return HttpResponse(PIXEL_GIF_DATA, content_type='image/gif')
+
+
+class Command(BaseCommand):
+    help = 'Measure the requests per second served by the message pixel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'id', type=int, help="Company ID"
+        )
+        parser.add_argument(
+            '-n', '--requests', type=int, default=1000,
+            help="Requests per view"
+        )
+
+    def handle(self, *args, **options):
+        company_id = options['id']
+        total = options['requests']
+
+        try:
+            company = Company.objects.get(pk=company_id)
+        except Company.DoesNotExist:
+            raise CommandError('Company "%s" does not exist' % company_id)
+
+        views = (
+            ('legacy', legacy_pixel_view),
+            ('current', MessagePixelView.as_view()),
+        )
+
+        # Everything runs in a transaction rolled back at the end, so the
+        # benchmark leaves no messages behind.
+        with transaction.atomic():
+            for name, view in views:
+                message = company.message_set.create(
+                    subject='Benchmark', content='Benchmark'
+                )
+                path = reverse('public:message_pixel', args=[message.pk])
+                request = RequestFactory().get(path)
+
+                start = time.perf_counter()
+                for i in range(total):
+                    view(request, pk=message.pk)
+                elapsed = time.perf_counter() - start
+
+                self.stdout.write('%s: %.0f requests/second' % (
+                    name, total / elapsed
+                ))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.template.engine import Context, Template
+from django.template.loader import get_template
+from django.utils.translation import activate
+
+from core.models import Company, Invite
+
+
+TEMPLATE_NAME = 'panel/invite/invite_email.html'
+SUBJECT = 'You have receive an invitation to join {{ object.company }}'
+
+
+def legacy_render(company, subject, template_name, context):
+    activate(company.language)
+    content = get_template(template_name).render(context)
+    subject = Template(subject).render(Context(context))
+    return subject, content
+
+
+class Command(BaseCommand):
+    help = 'Measure the time to render the email templates of 1000 recipients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'id', type=int, help="Company ID"
+        )
+        parser.add_argument(
+            '-n', '--recipients', type=int, default=1000,
+            help="Recipients per run"
+        )
+
+    def handle(self, *args, **options):
+        company_id = options['id']
+        total = options['recipients']
+
+        try:
+            company = Company.objects.get(pk=company_id)
+        except Company.DoesNotExist:
+            raise CommandError('Company "%s" does not exist' % company_id)
+
+        contexts = [
+            dict(
+                object=Invite(
+                    company=company, email='user{}@example.com'.format(i)
+                ),
+                scheme='https',
+                host=company.domain,
+                uid='MQ',
+                token='benchmark',
+            ) for i in range(total)
+        ]
+
+        start = time.perf_counter()
+        for context in contexts:
+            legacy_render(company, SUBJECT, TEMPLATE_NAME, context)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        list(company.message_set.render_html_emails(
+            SUBJECT, TEMPLATE_NAME, contexts
+        ))
+        current = time.perf_counter() - start
+
+        for name, elapsed in (('legacy', legacy), ('current', current)):
+            self.stdout.write('%s: %.0fms per 1000 recipients' % (
+                name, elapsed * 1000 * 1000 / total
+            ))
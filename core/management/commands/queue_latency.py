@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand
+
+from core.constants import QUEUE_LIST
+from core.tasks import get_queue_latency, reset_queue_latency
+
+
+class Command(BaseCommand):
+    help = 'Report how long tasks wait in each queue before they start'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help="Reset the stats after reporting them"
+        )
+
+    def handle(self, *args, **options):
+        for queue in QUEUE_LIST:
+            latency = get_queue_latency(queue)
+
+            self.stdout.write(
+                '%s: %d tasks, %.0fms average, %dms max' % (
+                    queue,
+                    latency['count'],
+                    latency['average'],
+                    latency['max'],
+                )
+            )
+
+            if options['reset']:
+                reset_queue_latency(queue)
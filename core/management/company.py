@@ -8,6 +8,8 @@ from django.contrib.auth.hashers import make_password
 from django.core.management.color import no_style
 from django.db import DEFAULT_DB_ALIAS, connections, router
 
+from core.utils import normalize_domain
+
 
 def create_default_company(
     app_config, verbosity=2, interactive=True,
@@ -45,6 +47,8 @@ def create_default_company(
             pk=getattr(settings, 'COMPANY_ID', 1),
             user=user,
             domain="example.com",
+            # The historical model has no custom save to normalize it.
+            normalized_domain=normalize_domain("example.com"),
             name="example.com",
             email="example@example.com"
         ).save(using=using)
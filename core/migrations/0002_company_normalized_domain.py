@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+from core.utils import normalize_domain
+
+
+def set_normalized_domain(apps, schema_editor):
+    Company = apps.get_model('core', 'Company')
+    companies = list(Company.objects.order_by('pk'))
+    domains = {}
+
+    for company in companies:
+        company.normalized_domain = normalize_domain(company.domain)
+        domains.setdefault(company.normalized_domain, []).append(
+            company.domain
+        )
+
+    # The unique constraint added next would fail with an IntegrityError
+    # that doesn't say which companies to fix.
+    collisions = [
+        ', '.join(sorted(group)) for group in domains.values()
+        if len(group) > 1
+    ]
+    if collisions:
+        raise ValueError(
+            "Companies with domains that normalize to the same host must be "
+            "fixed before migrating: {}.".format('; '.join(collisions))
+        )
+
+    for company in companies:
+        company.save(update_fields=['normalized_domain'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='normalized_domain',
+            field=models.CharField(default='', editable=False, max_length=255, verbose_name='normalized domain'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            set_normalized_domain, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='normalized_domain',
+            field=models.CharField(editable=False, max_length=255, unique=True, verbose_name='normalized domain'),
+        ),
+    ]
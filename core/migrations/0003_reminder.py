@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def create_reminders(apps, schema_editor):
+    Event = apps.get_model('core', 'Event')
+    Reminder = apps.get_model('core', 'Reminder')
+    date_start = timezone.now() - timedelta(minutes=30)
+    reminders = []
+
+    events = Event.objects.filter(
+        user__isnull=False,
+        date_start__gte=date_start
+    ).only('id', 'date_start', 'notify', 'notified')
+
+    for event in events.iterator():
+        notified = set((event.notified or '').split(','))
+        for turn in set((event.notify or '').split(',')) - notified:
+            if not turn:
+                continue
+            reminders.append(Reminder(
+                event_id=event.id,
+                turn=int(turn),
+                date_fire=event.date_start - timedelta(minutes=int(turn)),
+            ))
+
+    Reminder.objects.bulk_create(reminders, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_company_normalized_domain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reminder',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('turn', models.PositiveIntegerField(editable=False, verbose_name='turn')),
+                ('date_fire', models.DateTimeField(editable=False, verbose_name='fire date')),
+                ('date_send', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='send date')),
+                ('event', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='core.Event', verbose_name='event')),
+            ],
+            options={
+                'verbose_name': 'reminder',
+                'verbose_name_plural': 'reminders',
+                'ordering': ['date_fire'],
+                'unique_together': {('event', 'turn')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(condition=models.Q(date_send__isnull=True), fields=['date_fire'], name='core_reminder_pending_idx'),
+        ),
+        migrations.RunPython(create_reminders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+from core.mail import is_html_content
+
+
+def set_is_html(apps, schema_editor):
+    Message = apps.get_model('core', 'Message')
+    messages = []
+
+    for message in Message.objects.only('id', 'content').iterator():
+        message.is_html = is_html_content(message.content)
+        if message.is_html:
+            messages.append(message)
+
+    Message.objects.bulk_update(messages, ['is_html'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_reminder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='is_html',
+            field=models.BooleanField(default=False, editable=False, verbose_name='html'),
+        ),
+        migrations.RunPython(set_is_html, migrations.RunPython.noop),
+    ]
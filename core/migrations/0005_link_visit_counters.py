@@ -0,0 +1,49 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def set_visit_counters(apps, schema_editor):
+    Link = apps.get_model('core', 'Link')
+    Visit = apps.get_model('core', 'Visit')
+    visits = Visit.objects.filter(
+        link=OuterRef('pk')
+    ).order_by().values('link')
+
+    Link.objects.update(
+        total_visits=Coalesce(
+            Subquery(visits.annotate(value=Count('pk')).values('value')), 0
+        ),
+        date_first_visit=Subquery(
+            visits.annotate(value=Min('date_creation')).values('value')
+        ),
+        date_last_visit=Subquery(
+            visits.annotate(value=Max('date_creation')).values('value')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_message_is_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='date_first_visit',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='first visit date'),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='date_last_visit',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last visit date'),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='total_visits',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='total visits'),
+        ),
+        migrations.RunPython(set_visit_counters, migrations.RunPython.noop),
+    ]
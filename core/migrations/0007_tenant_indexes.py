@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date_start'], name='core_event_date_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invite',
+            index=models.Index(fields=['company', 'date_creation', 'id'], name='core_invite_company_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['company', 'date_creation', 'id'], name='core_link_company_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(date_read__isnull=True), fields=['company', 'user'], name='core_notif_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='role',
+            index=models.Index(fields=['company', 'name'], name='core_role_company_name_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0007_tenant_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='creation date')),
+                ('date_modification', models.DateTimeField(auto_now=True, verbose_name='modification date')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, verbose_name='id')),
+                ('action', models.CharField(editable=False, max_length=100, verbose_name='action')),
+                ('chunks_total', models.PositiveIntegerField(default=0, editable=False, verbose_name='total chunks')),
+                ('chunks_done', models.PositiveIntegerField(default=0, editable=False, verbose_name='done chunks')),
+                ('date_finish', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='finish date')),
+                ('company', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='core.Company', verbose_name='company')),
+                ('content_type', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType', verbose_name='content type')),
+                ('user', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'job',
+                'verbose_name_plural': 'jobs',
+                'ordering': ['-date_creation'],
+            },
+        ),
+        migrations.CreateModel(
+            name='JobChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(editable=False, verbose_name='index')),
+                ('object_ids', models.TextField(editable=False, verbose_name='object ids')),
+                ('date_finish', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='finish date')),
+                ('error', models.TextField(blank=True, editable=False, verbose_name='error')),
+                ('job', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='core.Job', verbose_name='job')),
+            ],
+            options={
+                'verbose_name': 'job chunk',
+                'verbose_name_plural': 'job chunks',
+                'ordering': ['job', 'index'],
+                'unique_together': {('job', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='chunks_failed',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='failed chunks'),
+        ),
+        migrations.AddField(
+            model_name='jobchunk',
+            name='date_fail',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='fail date'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_job_chunk_failed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='message',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.Message', verbose_name='message'),
+        ),
+    ]
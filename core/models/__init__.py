@@ -3,9 +3,12 @@ from core.models.colaborator import Colaborator
 from core.models.company import Company
 from core.models.event import Event
 from core.models.invite import Invite
+from core.models.job import Job
+from core.models.job_chunk import JobChunk
 from core.models.link import Link
 from core.models.message import Message
 from core.models.notification import Notification
+from core.models.reminder import Reminder
 from core.models.role import Role
 from core.models.visit import Visit
 from core.models.user import User
@@ -18,10 +21,13 @@ __all__ = [
     'Event',
     'Invite',
     'Invoice',
+    'Job',
+    'JobChunk',
     'Link',
     'Message',
     'Notification',
     'Payment',
+    'Reminder',
     'Role',
     'Visit',
     'User'
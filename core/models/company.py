@@ -1,55 +1,164 @@
+import hashlib
+
 from django.conf import settings
 from django.contrib.auth.models import Permission
-from django.core.exceptions import ImproperlyConfigured
-from django.db import models
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import models, transaction
 from django.db.models import signals
-from django.http.request import split_domain_port
 from django.urls import reverse_lazy
-from django.utils.functional import cached_property
-from django.utils.translation import ugettext_lazy as _
+from django.utils.translation import get_language, ugettext_lazy as _
 
 from boilerplate.mail import SendEmail
 from django_countries.fields import CountryField
 
+from core.cache import LocalCache, bump_version, get_version
 from core.constants import (
-    LEVEL_ERROR, LEVEL_SUCCESS, MODULE_LIST, MODULE_PRICE_LIST
+    COMPANY_CACHE_SHARED_TIMEOUT, COMPANY_CACHE_SIZE, COMPANY_CACHE_TIMEOUT,
+    COMPANY_MISS_CACHE_SIZE, COMPANY_MISS_CACHE_TIMEOUT, LEVEL_ERROR,
+    LEVEL_SUCCESS, MODULE_LIST, MODULE_PRICE_LIST, PERMISSION_CACHE_SIZE,
+    PERMISSION_CACHE_TIMEOUT
 )
 from core.context_processors import settings as secure_settings
 from core.models.mixins import AuditableMixin, get_active_mixin
+from core.utils import normalize_domain
 from core.validators import validate_domain, validate_comma_separated_str_list
 
 
-COMPANY_CACHE = {}
+COMPANY_CACHE = LocalCache(
+    maxsize=COMPANY_CACHE_SIZE, timeout=COMPANY_CACHE_TIMEOUT
+)
+COMPANY_CACHE_STATS = {
+    'hits': 0, 'shared_hits': 0, 'negative_hits': 0, 'misses': 0
+}
+COMPANY_DOMAINS_VERSION_KEY = 'core.company.domains.version'
+COMPANY_MISS_CACHE = LocalCache(
+    maxsize=COMPANY_MISS_CACHE_SIZE, timeout=COMPANY_MISS_CACHE_TIMEOUT
+)
+
+# Keyed by the shared permissions version and the excluded modules, and the
+# language for the choices.
+PERMISSION_CACHE = LocalCache(
+    maxsize=PERMISSION_CACHE_SIZE, timeout=PERMISSION_CACHE_TIMEOUT
+)
+PERMISSION_CHOICES_CACHE = LocalCache(
+    maxsize=PERMISSION_CACHE_SIZE, timeout=PERMISSION_CACHE_TIMEOUT
+)
+PERMISSION_VERSION_KEY = 'core.permissions.version'
+
+
+def get_company_cache_key(company_id):
+    return 'core.company.{}'.format(company_id)
+
+
+def get_company_host_cache_key(domain):
+    # Hosts come straight from the request, hash them to keep keys short.
+    return 'core.company.host.{}'.format(
+        hashlib.md5(domain.encode('utf-8')).hexdigest()
+    )
+
+
+def get_company_miss_cache_key(domain):
+    return '{}.miss'.format(get_company_host_cache_key(domain))
+
+
+def get_company_version_key(company_id):
+    return 'core.company.{}.version'.format(company_id)
 
 
 class CompanyManager(models.Manager):
     use_in_migrations = True
 
+    def _cache_company(self, company, version=None):
+        if version is None:
+            version = get_version(get_company_version_key(company.pk))
+
+        cache.set(
+            get_company_cache_key(company.pk), company,
+            COMPANY_CACHE_SHARED_TIMEOUT, version=version
+        )
+        COMPANY_CACHE.set(('pk', company.pk), (version, company))
+
     def _get_company_by_id(self, company_id):
-        if company_id not in COMPANY_CACHE:
+        version = get_version(get_company_version_key(company_id))
+        entry = COMPANY_CACHE.get(('pk', company_id))
+
+        if entry and entry[0] == version:
+            COMPANY_CACHE_STATS['hits'] += 1
+            return entry[1]
+
+        company = cache.get(get_company_cache_key(company_id), version=version)
+
+        if company is None:
+            COMPANY_CACHE_STATS['misses'] += 1
             company = self.get(pk=company_id)
-            COMPANY_CACHE[company_id] = company
-        return COMPANY_CACHE[company_id]
+            self._cache_company(company, version)
+        else:
+            COMPANY_CACHE_STATS['shared_hits'] += 1
+            COMPANY_CACHE.set(('pk', company_id), (version, company))
+
+        return company
+
+    def _get_company_by_host(self, host):
+        domain = normalize_domain(host)
+        host_key = get_company_host_cache_key(domain)
+        company_id = (
+            COMPANY_CACHE.get(('host', domain)) or cache.get(host_key)
+        )
+
+        if company_id is not None:
+            try:
+                company = self._get_company_by_id(company_id)
+            except self.model.DoesNotExist:
+                company = None
+
+            # The domain is checked again so a renamed company never needs a
+            # lookup of its previous domain to invalidate the host entry.
+            if company and company.normalized_domain == domain:
+                COMPANY_CACHE.set(('host', domain), company.pk)
+                return company
+
+        miss_key = get_company_miss_cache_key(domain)
+        domains_version = get_version(COMPANY_DOMAINS_VERSION_KEY)
+
+        if (
+            COMPANY_MISS_CACHE.get(domain) == domains_version or
+            cache.get(miss_key, version=domains_version)
+        ):
+            COMPANY_CACHE_STATS['negative_hits'] += 1
+            raise self.model.DoesNotExist(
+                "Company matching domain %r does not exist." % domain
+            )
+
+        COMPANY_CACHE_STATS['misses'] += 1
 
-    def _get_company_by_request(self, request):
-        host = request.get_host()
         try:
-            if host not in COMPANY_CACHE:
-                COMPANY_CACHE[host] = self.get(domain__iexact=host)
-            return COMPANY_CACHE[host]
+            company = self.get(normalized_domain=domain)
         except self.model.DoesNotExist:
-            domain, port = split_domain_port(host)
-            if domain not in COMPANY_CACHE:
-                COMPANY_CACHE[domain] = self.get(domain__iexact=domain)
-            return COMPANY_CACHE[domain]
+            cache.set(
+                miss_key, True, COMPANY_MISS_CACHE_TIMEOUT,
+                version=domains_version
+            )
+            COMPANY_MISS_CACHE.set(domain, domains_version)
+            raise
 
-    def get_current(self, request=None):
+        self._cache_company(company)
+        cache.set(host_key, company.pk, COMPANY_CACHE_SHARED_TIMEOUT)
+        COMPANY_CACHE.set(('host', domain), company.pk)
+        return company
+
+    def _get_company_by_request(self, request):
+        return self._get_company_by_host(request.get_host())
+
+    def get_current(self, request=None, host=None):
         from django.conf import settings
         if getattr(settings, 'COMPANY_ID', ''):
             company_id = settings.COMPANY_ID
             return self._get_company_by_id(company_id)
         elif request:
             return self._get_company_by_request(request)
+        elif host:
+            return self._get_company_by_host(host)
 
         raise ImproperlyConfigured(
             "You're using \"companies\" without having "
@@ -58,10 +167,16 @@ class CompanyManager(models.Manager):
             "Company.objects.get_current() to fix this error."
         )
 
+    def cache_info(self):
+        """Return the hit and miss counters of this process."""
+        return dict(COMPANY_CACHE_STATS, local=COMPANY_CACHE.stats())
+
     def clear_cache(self):
         """Clear the ``Company`` object cache."""
-        global COMPANY_CACHE
-        COMPANY_CACHE = {}
+        COMPANY_CACHE.clear()
+        COMPANY_MISS_CACHE.clear()
+        for key in COMPANY_CACHE_STATS:
+            COMPANY_CACHE_STATS[key] = 0
 
     def get_by_natural_key(self, domain):
         return self.get(domain=domain)
@@ -119,6 +234,10 @@ class Company(get_active_mixin(editable=True), AuditableMixin):
         max_length=255, validators=[validate_domain],
         unique=True, verbose_name=_("custom domain")
     )
+    normalized_domain = models.CharField(
+        max_length=255, unique=True, editable=False,
+        verbose_name=_("normalized domain")
+    )
     users = models.ManyToManyField(
         'core.User', blank=True,
         through='Colaborator', related_name='+',
@@ -166,6 +285,35 @@ class Company(get_active_mixin(editable=True), AuditableMixin):
     def get_absolute_url(self):
         return reverse_lazy('panel:company_detail')
 
+    def save(self, *args, **kwargs):
+        self.normalized_domain = normalize_domain(self.domain)
+        update_fields = kwargs.get('update_fields')
+
+        if update_fields is not None and 'domain' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {
+                'normalized_domain'
+            }
+
+        return super().save(*args, **kwargs)
+
+    def validate_unique(self, exclude=None):
+        """
+        Report domains that only differ once normalized on ``domain``, since
+        ``normalized_domain`` is not editable and forms skip its check.
+        """
+        super().validate_unique(exclude=exclude)
+
+        if exclude and 'domain' in exclude:
+            return
+
+        normalized_domain = normalize_domain(self.domain)
+        if Company.objects.exclude(pk=self.pk).filter(
+            normalized_domain=normalized_domain
+        ).exists():
+            raise ValidationError({'domain': _(
+                "A company with this domain already exists."
+            )})
+
     def get_module_display(self, module):
         return dict(self.MODULE_LIST).get(module)
 
@@ -258,35 +406,69 @@ class Company(get_active_mixin(editable=True), AuditableMixin):
         response = email.send()
         return response > 0
 
-    @cached_property
-    def permission_queryset(self):
-        perms = Permission.objects.all().exclude(
-            content_type__app_label__in=(
-                'admin', 'authtoken', 'contenttypes', 'sessions'
-            )
-        ).exclude(
-            content_type__app_label='core', content_type__model__in=(
-                'colaborator', 'notification'
-            )
-        ).exclude(
-            content_type__app_label='auth', content_type__model__in=(
-                'group', 'permission'
-            )
-        ).exclude(
-            content_type__app_label='core', codename__in=(
-                'add_attachment', 'change_attachment', 'delete_attachment',
-                'add_company', 'delete_company',
-                'add_message', 'change_message', 'delete_message',
-                'add_visit', 'change_visit', 'delete_visit'
+    def get_permission_ids(self):
+        """
+        Return the ids of the permissions a company can grant, shared by the
+        companies with the same modules.
+        """
+        module_excluded = tuple(sorted(self.module_excluded))
+        key = (get_version(PERMISSION_VERSION_KEY), module_excluded)
+        permission_ids = PERMISSION_CACHE.get(key)
+
+        if permission_ids is None:
+            perms = Permission.objects.all().exclude(
+                content_type__app_label__in=(
+                    'admin', 'authtoken', 'contenttypes', 'sessions'
+                )
+            ).exclude(
+                content_type__app_label='core', content_type__model__in=(
+                    'colaborator', 'notification'
+                )
+            ).exclude(
+                content_type__app_label='auth', content_type__model__in=(
+                    'group', 'permission'
+                )
+            ).exclude(
+                content_type__app_label='core', codename__in=(
+                    'add_attachment', 'change_attachment',
+                    'delete_attachment', 'add_company', 'delete_company',
+                    'add_message', 'change_message', 'delete_message',
+                    'add_visit', 'change_visit', 'delete_visit'
+                )
             )
+
+            if module_excluded:
+                perms = perms.exclude(
+                    content_type__app_label__in=module_excluded
+                )
+
+            permission_ids = tuple(perms.values_list('pk', flat=True))
+            PERMISSION_CACHE.set(key, permission_ids)
+
+        return permission_ids
+
+    @property
+    def permission_choices(self):
+        key = (
+            get_version(PERMISSION_VERSION_KEY),
+            tuple(sorted(self.module_excluded)),
+            get_language()
         )
+        choices = PERMISSION_CHOICES_CACHE.get(key)
 
-        if self.module_excluded:
-            perms = perms.exclude(
-                content_type__app_label__in=self.module_excluded
+        if choices is None:
+            choices = tuple(
+                (perm.pk, str(perm)) for perm in self.permission_queryset
             )
+            PERMISSION_CHOICES_CACHE.set(key, choices)
 
-        return perms.order_by(
+        return choices
+
+    @property
+    def permission_queryset(self):
+        return Permission.objects.filter(
+            pk__in=self.get_permission_ids()
+        ).order_by(
             'content_type__app_label', 'content_type', 'codename'
         ).select_related('content_type')
 
@@ -297,30 +479,31 @@ class Company(get_active_mixin(editable=True), AuditableMixin):
 
 def post_save_company(sender, instance, created, **kwargs):
     if created:
-        user = instance.user
-
-        user.company = instance
-        user.save(update_fields=['company'])
-        user.colaborator_set.get_or_create(company=instance)
+        instance.user.colaborator_set.get_or_create(company=instance)
 
         instance.notify_admins()
 
 
-def clear_company_cache(sender, **kwargs):
-    instance = kwargs['instance']
-    using = kwargs['using']
-    try:
-        del COMPANY_CACHE[instance.pk]
-    except KeyError:
-        pass
-    try:
-        del COMPANY_CACHE[
-            Company.objects.using(using).get(pk=instance.pk).domain
-        ]
-    except (KeyError, Company.DoesNotExist):
-        pass
+def clear_company_cache(sender, instance, **kwargs):
+    version_key = get_company_version_key(instance.pk)
+    COMPANY_CACHE.delete(('pk', instance.pk))
+    bump_version(version_key)
+    bump_version(COMPANY_DOMAINS_VERSION_KEY)
+    # Bump again once committed so workers that read the row before the
+    # commit don't keep serving it.
+    transaction.on_commit(lambda: bump_version(version_key))
+    transaction.on_commit(lambda: bump_version(COMPANY_DOMAINS_VERSION_KEY))
+
+
+def clear_permission_cache(**kwargs):
+    bump_version(PERMISSION_VERSION_KEY)
+    # Bump again once committed, like the company cache.
+    transaction.on_commit(lambda: bump_version(PERMISSION_VERSION_KEY))
 
 
-signals.pre_delete.connect(clear_company_cache, sender=Company)
-signals.pre_save.connect(clear_company_cache, sender=Company)
+signals.post_delete.connect(clear_company_cache, sender=Company)
+signals.post_save.connect(clear_company_cache, sender=Company)
 signals.post_save.connect(post_save_company, sender=Company)
+signals.post_delete.connect(clear_permission_cache, sender=Permission)
+signals.post_migrate.connect(clear_permission_cache)
+signals.post_save.connect(clear_permission_cache, sender=Permission)
@@ -5,6 +5,7 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.core.validators import validate_comma_separated_integer_list
 from django.db import models
+from django.db.models import signals
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.translation import activate, ugettext_lazy as _
@@ -93,6 +94,15 @@ class Event(AuditableMixin):
     )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'date_creation', 'id'],
+                name='core_event_company_date_idx'
+            ),
+            models.Index(
+                fields=['date_start'], name='core_event_date_start_idx'
+            ),
+        ]
         ordering = ['-date_creation']
         permissions = (
             ('view_all_event', 'Can view all event'),
@@ -184,33 +194,33 @@ class Event(AuditableMixin):
 
     @classmethod
     def check_all(cls):
-        date_start = timezone.now() - timedelta(minutes=NOTIFY_30)
+        from core.models import Reminder
+        return Reminder.objects.send_due()
 
-        qs = cls.objects.filter(
-            user__isnull=False,
-            date_start__gte=date_start
-        )
-        send = 0
-        failed = 0
-
-        for item in qs:
-            for turn in item.notification_pending_list:
-                if item.can_send(turn):
-                    if item.send(turn):
-                        send += 1
-                    else:
-                        failed += 1
-
-        return dict(
-            total=qs.count(),
-            send=send,
-            failed=failed
-        )
+    def schedule_reminders(self):
+        from core.models import Reminder
 
-    def send(self, turn=None, **kwargs):
-        if not self.user:
-            return LEVEL_ERROR, _("Event has no user.")
+        self.reminder_set.filter(date_send__isnull=True).delete()
+
+        if not self.user_id or not self.date_start:
+            return []
 
+        turns = set(
+            int(turn) for turn in self.notification_pending_list if turn
+        ) - set(self.reminder_set.values_list('turn', flat=True))
+
+        return Reminder.objects.bulk_create([
+            Reminder(
+                event=self,
+                turn=turn,
+                date_fire=self.date_start - timedelta(minutes=turn),
+            ) for turn in turns
+        ])
+
+    def create_message(self, turn=None):
+        """
+        Create the unsent reminder message of ``turn`` for the event user.
+        """
         cc = ''
 
         if self.share_with.all().exists():
@@ -218,7 +228,7 @@ class Event(AuditableMixin):
 
         activate(self.company.language)
 
-        template_name = 'public/event_email.html'
+        template_name = 'panel/event/event_email.html'
         context = secure_settings()
         context['object'] = self
         context['turn'] = self.get_notify_display(turn)
@@ -233,12 +243,18 @@ class Event(AuditableMixin):
             direction=DIRECTION_OUTBOUND,
             from_name=self.company.name,
             from_email=self.company.email,
-            model=self,
+            # Message.object_id is an integer, events use UUID keys.
+            model=self.model,
             to_email=self.user.email,
             to_email_cc=','.join(cc),
             subject=subject,
         )
-        return message.send()
+        return message
+
+    def send(self, turn=None, **kwargs):
+        if not self.user:
+            return LEVEL_ERROR, _("Event has no user.")
+        return self.create_message(turn).send()
 
     @property
     def subject(self):
@@ -263,3 +279,14 @@ class Event(AuditableMixin):
         if now > self.date_start:
             return 0
         return int((self.date_start - now).total_seconds() / 60)
+
+
+def post_save_event(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'date_start', 'notify', 'user'} & set(
+        update_fields
+    ):
+        return
+    instance.schedule_reminders()
+
+
+signals.post_save.connect(post_save_event, sender=Event)
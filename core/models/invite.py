@@ -1,14 +1,59 @@
 from django.db import models
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 from django.utils.translation import ugettext_lazy as _
 
-from core.constants import LEVEL_ERROR
+from core.constants import LEVEL_ERROR, LEVEL_INFO, LEVEL_SUCCESS
 from core.models.mixins import AuditableMixin, get_active_mixin
 from core.tokens import default_token_generator
 
 
+INVITE_TEMPLATE_NAME = 'panel/invite/invite_email.html'
+
+
+class InviteManager(models.Manager):
+    def send_pending(self, company, scheme=None, host=None, **kwargs):
+        """
+        Send every pending invite of ``company`` through a single SMTP
+        connection.
+        """
+        from core.models import Message
+
+        invites = list(self.filter(
+            company=company, date_send__isnull=True, user__isnull=True
+        ))
+
+        if not invites:
+            return LEVEL_INFO, _("There are no pending invites.")
+
+        messages = company.message_set.create_html_emails(
+            subject=invites[0].get_email_subject(),
+            template_name=INVITE_TEMPLATE_NAME,
+            recipients=[
+                (
+                    invite.get_email_context(scheme, host),
+                    dict(model=invite, to_email=invite.email),
+                ) for invite in invites
+            ],
+            from_name=company.name,
+            from_email=company.email,
+            user=kwargs.get('user_request', None),
+        )
+        messages = Message.objects.filter(
+            pk__in=[message.pk for message in messages]
+        )
+        response = Message.objects.send_many(messages, scheme, host)
+        self.filter(pk__in=messages.filter(
+            date_send__isnull=False
+        ).values_list('object_id', flat=True)).update(date_send=timezone.now())
+
+        return LEVEL_SUCCESS, _(
+            "%(send)d of %(total)d invites were sent."
+        ) % response
+
+
 class Invite(get_active_mixin(editable=True), AuditableMixin):
     company = models.ForeignKey(
         'core.Company', editable=False, on_delete=models.CASCADE,
@@ -32,7 +77,15 @@ class Invite(get_active_mixin(editable=True), AuditableMixin):
         verbose_name=_("user")
     )
 
+    objects = InviteManager()
+
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'date_creation', 'id'],
+                name='core_invite_company_date_idx'
+            ),
+        ]
         ordering = ['-date_creation']
         permissions = (
             ('send_invite', 'Can send invite'),
@@ -55,31 +108,40 @@ class Invite(get_active_mixin(editable=True), AuditableMixin):
         return True if self.date_send else False
     is_send.boolean = True
 
-    def send(self, scheme, host, **kwargs):
-        if self.user:
-            return LEVEL_ERROR, _("Invite was used already.")
-
-        context = dict(
+    def get_email_context(self, scheme, host):
+        return dict(
             object=self,
             scheme=scheme,
             host=host,
             uid=urlsafe_base64_encode(force_bytes(self.pk)),
             token=default_token_generator.make_token(self)
         )
-        subject = _(
+
+    def get_email_subject(self):
+        return _(
             "You have receive an invitation to join %(company)s"
         ) % dict(
             company=self.company
         )
 
+    def send(self, scheme, host, **kwargs):
+        if self.user:
+            return LEVEL_ERROR, _("Invite was used already.")
+
         message = self.company.message_set.create_html_email(
             from_name=self.company.name,
             from_email=self.company.email,
             model=self,
             to_email=self.email,
-            subject=subject,
-            template_name='panel/invite/invite_email.html',
-            context=context,
+            subject=self.get_email_subject(),
+            template_name=INVITE_TEMPLATE_NAME,
+            context=self.get_email_context(scheme, host),
             user=kwargs.get('user', None),
         )
-        return message.send(scheme=scheme, host=host)
+        response = message.send(scheme=scheme, host=host)
+
+        if response[0] == LEVEL_SUCCESS:
+            self.date_send = timezone.now()
+            self.save(update_fields=['date_send'])
+
+        return response
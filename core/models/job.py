@@ -0,0 +1,174 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from core.constants import JOB_CHUNK_SIZE, LEVEL_SUCCESS, LEVEL_WARNING
+from core.models.mixins import AuditableMixin
+
+
+class JobManager(models.Manager):
+    def create_job(
+        self, company, user, queryset, action, chunk_size=JOB_CHUNK_SIZE
+    ):
+        """
+        Split the objects of ``queryset`` in chunks of ``chunk_size`` to run
+        ``action`` on each of them.
+        """
+        from core.models import JobChunk
+
+        object_ids = [
+            str(pk) for pk in queryset.order_by().values_list('pk', flat=True)
+        ]
+        job = self.create(
+            company=company,
+            user=user,
+            content_type=ContentType.objects.get_for_model(queryset.model),
+            action=action,
+            chunks_total=len(range(0, len(object_ids), chunk_size)),
+        )
+        JobChunk.objects.bulk_create([
+            JobChunk(
+                job=job,
+                index=index,
+                object_ids=','.join(object_ids[start:start + chunk_size]),
+            ) for index, start in enumerate(
+                range(0, len(object_ids), chunk_size)
+            )
+        ])
+        return job
+
+
+class Job(AuditableMixin):
+    id = models.UUIDField(
+        default=uuid.uuid4, primary_key=True, editable=False,
+        verbose_name=_("id")
+    )
+    company = models.ForeignKey(
+        'core.Company', editable=False, on_delete=models.CASCADE,
+        db_index=True, verbose_name=_("company")
+    )
+    user = models.ForeignKey(
+        'core.User', blank=True, null=True, editable=False,
+        on_delete=models.SET_NULL, db_index=True, verbose_name=_("user")
+    )
+    content_type = models.ForeignKey(
+        'contenttypes.ContentType', editable=False, on_delete=models.CASCADE,
+        db_index=True, verbose_name=_("content type")
+    )
+    action = models.CharField(
+        max_length=100, editable=False, verbose_name=_("action")
+    )
+    chunks_total = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_("total chunks")
+    )
+    chunks_done = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_("done chunks")
+    )
+    chunks_failed = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_("failed chunks")
+    )
+    date_finish = models.DateTimeField(
+        blank=True, null=True, editable=False, verbose_name=_("finish date")
+    )
+
+    objects = JobManager()
+
+    class Meta:
+        ordering = ['-date_creation', ]
+        verbose_name = _("job")
+        verbose_name_plural = _("jobs")
+
+    def __str__(self):
+        return "%s %s" % (self.content_type, self.action)
+
+    def check_finish(self):
+        """
+        Finish the job once every chunk is either done or failed, otherwise
+        publish its progress.
+        """
+        self.refresh_from_db(fields=['chunks_done', 'chunks_failed'])
+
+        if self.chunks_done + self.chunks_failed >= self.chunks_total:
+            return self.finish()
+        self.publish_progress()
+
+    def finish(self):
+        """
+        Close the job and notify the user. Only the first caller closes it,
+        so chunks settling at the same time notify once.
+        """
+        finished = Job.objects.filter(
+            pk=self.pk, date_finish__isnull=True
+        ).update(date_finish=timezone.now())
+
+        if not finished:
+            return
+
+        self.refresh_from_db(
+            fields=['chunks_done', 'chunks_failed', 'date_finish']
+        )
+        self.publish_progress()
+
+        if not self.user:
+            return
+
+        if self.chunks_done == self.chunks_total:
+            level = LEVEL_SUCCESS
+        else:
+            level = LEVEL_WARNING
+
+        self.user.add_notification(
+            company=self.company,
+            model=self.content_type.model_class(),
+            obj=str(self),
+            response=(level, _(
+                "%(done)d of %(total)d batches of %(action)s were processed."
+            ) % dict(
+                done=self.chunks_done,
+                total=self.chunks_total,
+                action=self.action,
+            ))
+        )
+
+    def get_progress_data(self):
+        return dict(
+            id=str(self.pk),
+            action=self.action,
+            model=str(self.content_type),
+            done=self.chunks_done,
+            failed=self.chunks_failed,
+            total=self.chunks_total,
+            is_finished=bool(self.date_finish),
+        )
+
+    def publish_progress(self):
+        from core.consumers import publish_job
+
+        if self.user_id:
+            publish_job(
+                self.user_id, self.company_id, self.get_progress_data()
+            )
+
+    def run(self):
+        """
+        Dispatch the pending chunks, so running a job again resumes it. The
+        last chunk to finish or fail finishes the job.
+        """
+        from core import tasks
+
+        chunk_ids = list(self.jobchunk_set.filter(
+            date_fail__isnull=True, date_finish__isnull=True
+        ).values_list('pk', flat=True))
+
+        if not chunk_ids:
+            return self.finish()
+
+        for chunk_id in chunk_ids:
+            if settings.DEBUG:
+                tasks.job_chunk_task(chunk_id=chunk_id)
+            else:
+                tasks.job_chunk_task.delay(chunk_id=chunk_id)
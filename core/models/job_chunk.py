@@ -0,0 +1,92 @@
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+
+class JobChunk(models.Model):
+    job = models.ForeignKey(
+        'core.Job', editable=False, on_delete=models.CASCADE,
+        db_index=True, verbose_name=_("job")
+    )
+    index = models.PositiveIntegerField(
+        editable=False, verbose_name=_("index")
+    )
+    object_ids = models.TextField(
+        editable=False, verbose_name=_("object ids")
+    )
+    date_finish = models.DateTimeField(
+        blank=True, null=True, editable=False, verbose_name=_("finish date")
+    )
+    date_fail = models.DateTimeField(
+        blank=True, null=True, editable=False, verbose_name=_("fail date")
+    )
+    error = models.TextField(
+        blank=True, editable=False, verbose_name=_("error")
+    )
+
+    class Meta:
+        ordering = ['job', 'index']
+        unique_together = ('job', 'index')
+        verbose_name = _("job chunk")
+        verbose_name_plural = _("job chunks")
+
+    def __str__(self):
+        return "%s #%s" % (self.job, self.index)
+
+    @property
+    def object_id_list(self):
+        return self.object_ids.split(',') if self.object_ids else []
+
+    def run(self):
+        """
+        Run the job action on every object of the chunk in one transaction.
+        Finished chunks are skipped, so a redelivered task is harmless.
+        Errors are recorded and raised again for the task to retry.
+        """
+        from core.models import Job
+
+        job = self.job
+        model = job.content_type.model_class()
+
+        try:
+            with transaction.atomic():
+                chunk = JobChunk.objects.select_for_update().get(pk=self.pk)
+
+                if chunk.date_finish:
+                    return True
+
+                for obj in model.objects.filter(pk__in=self.object_id_list):
+                    getattr(obj, job.action)()
+
+                self.date_finish = timezone.now()
+                self.error = ''
+                self.save(update_fields=['date_finish', 'error'])
+                Job.objects.filter(pk=job.pk).update(
+                    chunks_done=F('chunks_done') + 1
+                )
+        except Exception as err:
+            JobChunk.objects.filter(pk=self.pk).update(error='%s' % err)
+            raise
+
+        job.check_finish()
+        return True
+
+    def set_failed(self):
+        """
+        Give up on the chunk once its retries run out, it counts as settled
+        for the job.
+        """
+        from core.models import Job
+
+        with transaction.atomic():
+            failed = JobChunk.objects.filter(
+                pk=self.pk, date_fail__isnull=True, date_finish__isnull=True
+            ).update(date_fail=timezone.now())
+
+            if failed:
+                Job.objects.filter(pk=self.job_id).update(
+                    chunks_failed=F('chunks_failed') + 1
+                )
+
+        self.job.check_finish()
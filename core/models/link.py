@@ -1,13 +1,65 @@
 import uuid
 
 from django.db import models
+from django.db.models import Count, F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.urls import reverse_lazy
-from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
 from core.models.mixins import AuditableMixin, get_active_mixin
 
 
+class LinkQuerySet(models.QuerySet):
+    def add_visits(self, count, date_first, date_last):
+        """
+        Add ``count`` visits made between ``date_first`` and ``date_last`` to
+        the counters of every link in the queryset.
+        """
+        return self.update(
+            total_visits=F('total_visits') + count,
+            date_first_visit=Least(
+                Coalesce(F('date_first_visit'), date_first), date_first
+            ),
+            date_last_visit=Greatest(
+                Coalesce(F('date_last_visit'), date_last), date_last
+            ),
+        )
+
+    def update_visit_stats(self):
+        """
+        Recompute the visit counters from the visit table.
+        """
+        from core.models import Visit
+
+        visits = Visit.objects.filter(
+            link=OuterRef('pk')
+        ).order_by().values('link')
+
+        return self.update(
+            total_visits=Coalesce(
+                Subquery(visits.annotate(value=Count('pk')).values('value')),
+                0
+            ),
+            date_first_visit=Subquery(
+                visits.annotate(value=Min('date_creation')).values('value')
+            ),
+            date_last_visit=Subquery(
+                visits.annotate(value=Max('date_creation')).values('value')
+            ),
+        )
+
+    def with_visit_stats(self):
+        """
+        Annotate the visit counters computed from the visit table, to check
+        them against the stored ones.
+        """
+        return self.annotate(
+            visit_count=Count('visit'),
+            visit_first=Min('visit__date_creation'),
+            visit_last=Max('visit__date_creation'),
+        )
+
+
 class Link(get_active_mixin(editable=True), AuditableMixin):
     id = models.UUIDField(
         default=uuid.uuid4, primary_key=True, editable=False,
@@ -28,8 +80,27 @@ class Link(get_active_mixin(editable=True), AuditableMixin):
     destination = models.URLField(
         verbose_name=_("destination")
     )
+    total_visits = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_("total visits")
+    )
+    date_first_visit = models.DateTimeField(
+        blank=True, null=True, editable=False,
+        verbose_name=_("first visit date")
+    )
+    date_last_visit = models.DateTimeField(
+        blank=True, null=True, editable=False,
+        verbose_name=_("last visit date")
+    )
+
+    objects = LinkQuerySet.as_manager()
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'date_creation', 'id'],
+                name='core_link_company_date_idx'
+            ),
+        ]
         ordering = ['-date_creation', ]
         permissions = (
             ('view_all_link', 'Can view all link'),
@@ -63,9 +134,9 @@ class Link(get_active_mixin(editable=True), AuditableMixin):
         return self.total_visits > 0
     is_open.boolean = True
 
-    @cached_property
-    def total_visits(self):
-        return self.visit_set.all().count()
-
     def visit_create(self, ip_address, **kwargs):
-        return self.visit_set.create(ip_address=ip_address)
+        visit = self.visit_set.create(ip_address=ip_address)
+        Link.objects.filter(pk=self.pk).add_visits(
+            1, visit.date_creation, visit.date_creation
+        )
+        return visit
@@ -1,32 +1,43 @@
-import re
+from itertools import groupby, islice
+from smtplib import SMTPException
 import uuid
 
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.core.mail import get_connection, EmailMultiAlternatives
 from django.db import models
-from django.template.engine import Context, Template
+from django.template.engine import Context
 from django.template.loader import get_template
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.translation import activate, ugettext_lazy as _
 
-from bs4 import BeautifulSoup
-
 from core.constants import (
-    DIRECTION_INBOUND, DIRECTION_OUTBOUND, HREF_REGEX, LEVEL_ERROR,
-    LEVEL_SUCCESS, URL_REGEX
+    DIRECTION_INBOUND, DIRECTION_OUTBOUND, LEVEL_ERROR, LEVEL_SUCCESS,
+    MESSAGE_BATCH_SIZE
+)
+from core.mail import (
+    LINK_PLACEHOLDER, get_subject_template, is_html_content, render_content,
+    replace_link_placeholders
 )
 from core.models.mixins import AuditableMixin
 
 
+def close_connection(connection):
+    if connection is None:
+        return
+
+    try:
+        connection.close()
+    except (OSError, SMTPException):
+        pass
+
+
 class MessageManager(models.Manager):
     def create_html_email(self, subject, template_name, context, **kwargs):
-        activate(self.instance.language)
-
-        content_template = get_template(template_name)
-        content = content_template.render(context)
-        subject = Template(subject).render(Context(context))
+        subject, content = next(
+            self.render_html_emails(subject, template_name, [context])
+        )
 
         return self.create(
             content=content,
@@ -34,6 +45,121 @@ class MessageManager(models.Manager):
             **kwargs
         )
 
+    def create_html_emails(self, subject, template_name, recipients, **kwargs):
+        """
+        Create a message per ``(context, message_kwargs)`` recipient pair with
+        a single insert, rendering the templates compiled once.
+        """
+        recipients = list(recipients)
+        rendered = self.render_html_emails(
+            subject, template_name, [recipient[0] for recipient in recipients]
+        )
+        messages = []
+
+        for (message_subject, content), (context, message_kwargs) in zip(
+            rendered, recipients
+        ):
+            messages.append(self.model(
+                company=self.instance,
+                content=content,
+                is_html=is_html_content(content),
+                subject=message_subject,
+                **dict(kwargs, **message_kwargs)
+            ))
+
+        return self.bulk_create(messages)
+
+    def render_html_emails(self, subject, template_name, contexts):
+        """
+        Yield the ``(subject, content)`` pair of each context.
+        """
+        activate(self.instance.language)
+
+        content_template = get_template(template_name)
+        subject_template = get_subject_template(subject)
+
+        for context in contexts:
+            yield (
+                subject_template.render(Context(context)),
+                content_template.render(context),
+            )
+
+    def send_many(
+        self, queryset=None, scheme=None, host=None,
+        batch_size=MESSAGE_BATCH_SIZE
+    ):
+        """
+        Send every unsent message of ``queryset`` opening one connection per
+        set of company SMTP credentials.
+        """
+        qs = queryset if queryset is not None else self.all()
+        qs = qs.filter(
+            date_send__isnull=True
+        ).select_related('company').order_by(
+            'company__mailgun_email', 'company__mailgun_password'
+        )
+        send = 0
+        failed = 0
+
+        def get_credentials(message):
+            company = message.company
+            if not company.mailgun_available:
+                return None
+            return company.mailgun_email, company.mailgun_password
+
+        for credentials, messages in groupby(qs.iterator(), get_credentials):
+            connection = None
+
+            try:
+                while True:
+                    batch = list(islice(messages, batch_size))
+
+                    if not batch:
+                        break
+
+                    sent_ids = []
+                    failed_ids = []
+
+                    for message in batch:
+                        try:
+                            if connection is None:
+                                connection = message.get_email_connection()
+                                connection.open()
+                            email = message.get_email(scheme, host, connection)
+                            is_sent = connection.send_messages([email])
+                        except (OSError, SMTPException):
+                            # A dropped connection is opened again for the
+                            # next message.
+                            close_connection(connection)
+                            connection = None
+                            is_sent = False
+
+                        if is_sent:
+                            sent_ids.append(message.pk)
+                        else:
+                            failed_ids.append(message.pk)
+
+                    send += len(sent_ids)
+                    failed += len(failed_ids)
+                    self.model.objects.filter(pk__in=sent_ids).update(
+                        date_send=timezone.now()
+                    )
+                    self.model.objects.filter(pk__in=failed_ids).update(
+                        date_fail=timezone.now()
+                    )
+            finally:
+                close_connection(connection)
+
+        return dict(total=send + failed, send=send, failed=failed)
+
+    def mark_read(self, pk):
+        """
+        Set the read date of an unread message without loading it.
+        """
+        return self.filter(pk=pk, date_read__isnull=True).update(
+            date_read=timezone.now()
+        )
+
     def read_all(self):
         return self.filter(
             direction=DIRECTION_INBOUND,
@@ -112,10 +238,19 @@ class Message(AuditableMixin):
     content = models.TextField(
         verbose_name=_("content")
     )
+    is_html = models.BooleanField(
+        default=False, editable=False, verbose_name=_("html")
+    )
 
     objects = MessageManager()
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'date_creation', 'id'],
+                name='core_message_company_date_idx'
+            ),
+        ]
         ordering = ["-date_creation", ]
         permissions = (
             ('send_message', 'Can send message'),
@@ -131,28 +266,11 @@ class Message(AuditableMixin):
 
     @property
     def content_html(self):
-        return self.content if self.is_html() else ''
+        return self.content if self.is_html else ''
 
     @property
     def content_raw(self):
-        if not self.is_html():
-            return self.content
-
-        content_html = BeautifulSoup(self.content, "html.parser")
-        body = content_html.body
-
-        if body:
-            content_raw = body.get_text()
-        else:
-            content_raw = content_html.get_text()
-
-        lines = []
-
-        for line in content_raw.split('\n'):
-            if line.strip():
-                lines.append(line.strip())
-
-        return '\n'.join(lines)
+        return render_content(self.content, self.is_html)[0]
 
     @property
     def from_(self):
@@ -179,10 +297,6 @@ class Message(AuditableMixin):
         return True if self.date_fail else False
     is_fail.boolean = True
 
-    def is_html(self):
-        return bool(BeautifulSoup(self.content, "html.parser").find())
-    is_html.boolean = True
-
     def is_read(self):
         return True if self.date_read else False
     is_read.boolean = True
@@ -212,7 +326,7 @@ class Message(AuditableMixin):
             'object': self,
             'emails': data['emails']
         })
-        content_raw = BeautifulSoup(content_html, "html.parser").get_text()
+        content_raw = render_content(content_html, True)[0]
 
         subject = _(
             '[%(company)s] Message has bounce'
@@ -235,11 +349,18 @@ class Message(AuditableMixin):
         if self.is_send():
             return LEVEL_ERROR, _("Message was sent already.")
 
-        activate(self.company.language)
-        content_raw, content_html = self.set_links(scheme, host)
+        email = self.get_email(scheme, host, self.get_email_connection())
 
-        if content_html:
-            content_html = self.set_pixel(content_html, scheme, host)
+        if email.send() > 0:
+            self.date_send = timezone.now()
+            self.save(update_fields=['date_send'])
+            return LEVEL_SUCCESS, _("Message sent successfully.")
+        else:
+            return LEVEL_ERROR, _("An error has ocurred.")
+
+    def get_email(self, scheme=None, host=None, connection=None):
+        activate(self.company.language)
+        content_raw, content_html = self.get_content(scheme, host)
 
         from_email = "%s <%s>" % (self.from_name, self.from_email)
         headers = {
@@ -250,7 +371,7 @@ class Message(AuditableMixin):
             bcc=self.to_email_bcc.split(',') if self.to_email_bcc else None,
             body=content_raw,
             cc=self.to_email_cc.split(',') if self.to_email_cc else None,
-            connection=self.get_email_connection(),
+            connection=connection,
             from_email=from_email,
             headers=headers,
             reply_to=(
@@ -263,76 +384,83 @@ class Message(AuditableMixin):
         if content_html:
             email.attach_alternative(content_html, 'text/html')
 
-        if email.send() > 0:
-            self.date_send = timezone.now()
-            self.save(update_fields=['date_send'])
-            return LEVEL_SUCCESS, _("Message sent successfully.")
-        else:
-            return LEVEL_ERROR, _("An error has ocurred.")
+        return email
+
+    def get_content(self, scheme=None, host=None):
+        """
+        Return the ``(content_raw, content_html)`` pair to send, with links
+        replaced by tracked ones and the read pixel added.
+        """
+        host = host or self.company.domain
+        destinations = {}
+
+        # Links are collected as placeholders while parsing, created in bulk
+        # and then swapped in with one substitution over each part.
+        def collect_url(destination):
+            index = destinations.setdefault(destination, len(destinations))
+            return LINK_PLACEHOLDER.format(index)
+
+        content_raw, content_html = render_content(
+            self.content, self.is_html, collect_url,
+            self.get_pixel_url(scheme, host)
+        )
 
-    def set_links(self, scheme=None, host=None):
-        if self.is_html():
-            content_html = self.content
-            regex = re.compile(HREF_REGEX, re.IGNORECASE)
-            founded = re.finditer(regex, content_html or '')
+        if not destinations:
+            return content_raw, content_html
 
-            for element in founded:
-                href = str(element.group(0))
-                destination = href.replace('href="', '')[:-1]
+        public_urls = self.set_links(destinations, scheme, host)
+        urls = [public_urls[destination] for destination in destinations]
 
-                link, created = self.link_set.get_or_create(
-                    company=self.company,
-                    destination=destination,
-                )
-                replace = href.replace(
-                    destination, link.get_public_url(scheme, host)
-                )
-                content_html = content_html.replace(href, replace)
-        else:
-            content_html = None
-
-        content_raw = self.content_raw
-        regex = re.compile(URL_REGEX, re.IGNORECASE)
-        founded = re.finditer(regex, content_raw or '')
-
-        for element in founded:
-            destination = str(element.group(0))
+        return (
+            replace_link_placeholders(content_raw, urls),
+            replace_link_placeholders(content_html, urls),
+        )
 
-            link, created = self.link_set.get_or_create(
-                company=self.company,
-                destination=destination,
-            )
-            replace = href.replace(
-                destination, link.get_public_url(scheme, host)
-            )
-            content_raw = content_raw.replace(href, replace)
-
-        return content_raw, content_html
-
-    def set_pixel(self, content, scheme=None, host=None):
-        bs_content = BeautifulSoup(content, "html.parser")
-        pixel = bs_content.new_tag(
-            'img',
-            alt='x',
-            height='1px',
-            src='{scheme}://{domain}{path}'.format(
-                scheme=(
-                    scheme if scheme else 'http' if settings.DEBUG else 'https'
-                ),
-                domain=host if host else self.company.domain,
-                path=reverse_lazy(
-                    'public:message_pixel', args=[self.pk]
-                )
+    def get_pixel_url(self, scheme=None, host=None):
+        return '{scheme}://{domain}{path}'.format(
+            scheme=(
+                scheme if scheme else 'http' if settings.DEBUG else 'https'
             ),
-            width='1px',
+            domain=host if host else self.company.domain,
+            path=reverse_lazy(
+                'public:message_pixel', args=[self.pk]
+            )
         )
 
-        if bs_content.body:
-            bs_content.body.insert(3, pixel)
-        else:
-            bs_content.append(pixel)
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+
+        if update_fields is None or 'content' in update_fields:
+            self.is_html = is_html_content(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'is_html'}
 
-        return bs_content.prettify()
+        return super().save(*args, **kwargs)
+
+    def set_links(self, destinations, scheme=None, host=None):
+        """
+        Return the public URL of the link of each destination, creating the
+        missing ones with a single query.
+        """
+        links = {
+            link.destination: link
+            for link in self.link_set.filter(destination__in=destinations)
+        }
+        Link = self.link_set.model
+        links.update(
+            (link.destination, link) for link in Link.objects.bulk_create([
+                Link(
+                    company=self.company,
+                    message=self,
+                    destination=destination,
+                ) for destination in destinations if destination not in links
+            ])
+        )
+
+        return {
+            destination: link.get_public_url(scheme, host)
+            for destination, link in links.items()
+        }
 
     def set_read(self):
         if self.is_read():
@@ -1,22 +1,130 @@
 import uuid
 
 from django.contrib.contenttypes.fields import GenericForeignKey
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Q, signals
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from core.constants import LEVEL_ERROR, LEVEL_SUCCESS
+from core.constants import (
+    LEVEL_ERROR, LEVEL_SUCCESS, NOTIFICATION_RECONCILE_BATCH_SIZE,
+    NOTIFICATION_UNREAD_TIMEOUT
+)
 from core.models.mixins import AuditableMixin
 
 
+def get_unread_cache_key(user_id, company_id):
+    return 'core.user.{}.company.{}.notifications.unread'.format(
+        user_id, company_id
+    )
+
+
+def change_unread_count(user_id, company_id, delta):
+    """
+    Move the cached unread counter, missing counters are left to be counted
+    on the next read.
+    """
+    try:
+        return cache.incr(get_unread_cache_key(user_id, company_id), delta)
+    except ValueError:
+        return None
+
+
+def publish_notifications_on_commit(user_id, company_id, notifications):
+    from core.consumers import publish_notifications
+
+    data = [notification.get_push_data() for notification in notifications]
+    transaction.on_commit(
+        lambda: publish_notifications(user_id, company_id, data)
+    )
+
+
 class NotificationManager(models.Manager):
+    def get_unread_count(self, company, user):
+        key = get_unread_cache_key(user.pk, company.pk)
+        count = cache.get(key)
+
+        if count is None:
+            count = self.filter(
+                company=company,
+                user=user,
+                date_read__isnull=True
+            ).count()
+            cache.add(key, count, NOTIFICATION_UNREAD_TIMEOUT)
+
+        return max(count, 0)
+
+    def reconcile_unread_counts(
+        self, batch_size=NOTIFICATION_RECONCILE_BATCH_SIZE
+    ):
+        """
+        Drop the cached unread counters that drifted from the database,
+        checking colaborators in batches. Only counters present in the cache
+        are compared, and a dropped counter is counted again on its next
+        read, so a concurrent increment is never overwritten by a stale
+        total. Return the number of counters dropped.
+        """
+        from core.models import Colaborator
+
+        dropped = 0
+        last_pk = 0
+
+        while True:
+            batch = Colaborator.objects.filter(
+                pk__gt=last_pk
+            ).order_by('pk').values_list('pk', 'user', 'company')
+            batch = list(batch[:batch_size])
+
+            if not batch:
+                return dropped
+
+            last_pk = batch[-1][0]
+            pairs = {
+                get_unread_cache_key(user_id, company_id): (
+                    user_id, company_id
+                ) for pk, user_id, company_id in batch
+            }
+            cached = cache.get_many(pairs)
+
+            if not cached:
+                continue
+
+            counts = self.filter(
+                date_read__isnull=True,
+                company__in={pairs[key][1] for key in cached},
+                user__in={pairs[key][0] for key in cached},
+            ).order_by().values('company', 'user').annotate(total=Count('pk'))
+            totals = {
+                (row['user'], row['company']): row['total'] for row in counts
+            }
+
+            stale = [
+                key for key, count in cached.items()
+                if count != totals.get(pairs[key], 0)
+            ]
+            if not stale:
+                continue
+
+            # Counters moved since they were read already include the
+            # change, leave them alone.
+            current = cache.get_many(stale)
+            stale = [key for key in stale if current.get(key) == cached[key]]
+            cache.delete_many(stale)
+            dropped += len(stale)
+
     def set_all_read(self, company, user, *args, **kwargs):
-        return self.filter(
+        response = self.filter(
             company=company,
             user=user,
             date_read__isnull=True
         ).update(date_read=timezone.now())
+        cache.set(
+            get_unread_cache_key(user.pk, company.pk), 0,
+            NOTIFICATION_UNREAD_TIMEOUT
+        )
+        return response
 
 
 class Notification(AuditableMixin):
@@ -60,6 +168,17 @@ class Notification(AuditableMixin):
     objects = NotificationManager()
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'date_creation', 'id'],
+                name='core_notif_company_date_idx'
+            ),
+            models.Index(
+                fields=['company', 'user'],
+                condition=Q(date_read__isnull=True),
+                name='core_notif_unread_idx'
+            ),
+        ]
         ordering = ["-date_creation", ]
         verbose_name = _("notification")
         verbose_name_plural = _("notifications")
@@ -70,6 +189,16 @@ class Notification(AuditableMixin):
     def get_absolute_url(self):
         return reverse_lazy('panel:notification_detail', args=[self.pk])
 
+    def get_push_data(self):
+        return dict(
+            id=str(self.pk),
+            model=str(self.model or self.content_type),
+            level=self.level,
+            content=self.content,
+            destination=self.destination,
+            date_creation=self.date_creation.isoformat(),
+        )
+
     def is_read(self):
         return True if self.date_read else False
     is_read.boolean = True
@@ -83,6 +212,7 @@ class Notification(AuditableMixin):
             return LEVEL_ERROR, _("Notification is read already.")
         self.date_read = timezone.now()
         self.save(update_fields=['date_read'])
+        change_unread_count(self.user_id, self.company_id, -1)
         return LEVEL_SUCCESS, _("Notification has been marked as read.")
 
     def set_unread(self):
@@ -90,4 +220,22 @@ class Notification(AuditableMixin):
             return LEVEL_ERROR, _("Notification is unread already.")
         self.date_read = None
         self.save(update_fields=['date_read'])
+        change_unread_count(self.user_id, self.company_id, 1)
         return LEVEL_SUCCESS, _("Notification has been marked as unread.")
+
+
+def post_delete_notification(sender, instance, **kwargs):
+    if not instance.date_read:
+        change_unread_count(instance.user_id, instance.company_id, -1)
+
+
+def post_save_notification(sender, instance, created, **kwargs):
+    if created and not instance.date_read:
+        change_unread_count(instance.user_id, instance.company_id, 1)
+        publish_notifications_on_commit(
+            instance.user_id, instance.company_id, [instance]
+        )
+
+
+signals.post_delete.connect(post_delete_notification, sender=Notification)
+signals.post_save.connect(post_save_notification, sender=Notification)
@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from core.constants import (
+    LEVEL_SUCCESS, NOTIFY_30, REMINDER_BATCH_SIZE, REMINDER_LOCK_TIMEOUT
+)
+
+
+REMINDER_LOCK_KEY = 'core.reminder.send.lock'
+
+
+class ReminderManager(models.Manager):
+    def send_due(self, batch_size=REMINDER_BATCH_SIZE):
+        """
+        Send the due reminders in batches. Each batch is claimed and given
+        its messages in a transaction, and sent once it is committed. A
+        reminder keeps its message, so a failed send is retried with it on
+        the next run.
+        """
+        from core.models import Message
+
+        if not cache.add(REMINDER_LOCK_KEY, True, REMINDER_LOCK_TIMEOUT):
+            return dict(total=0, send=0, failed=0)
+
+        now = timezone.now()
+        date_start = now - timedelta(minutes=NOTIFY_30)
+        processed_ids = []
+        failed = 0
+        send = 0
+
+        try:
+            # Reminders whose event is already past the sending window would
+            # be picked up by every run otherwise.
+            self.filter(
+                date_send__isnull=True,
+                date_fire__lte=now,
+                event__date_start__lt=date_start
+            ).delete()
+
+            while True:
+                with transaction.atomic():
+                    reminders = list(
+                        self.select_for_update(
+                            skip_locked=True, of=('self', )
+                        )
+                        .filter(
+                            date_send__isnull=True,
+                            date_fire__lte=now,
+                            event__user__isnull=False,
+                        )
+                        .exclude(pk__in=processed_ids)
+                        .select_related(
+                            'event', 'event__company', 'event__user'
+                        )
+                        .order_by('date_fire')[:batch_size]
+                    )
+
+                    if not reminders:
+                        break
+
+                    for reminder in reminders:
+                        if reminder.message_id is None:
+                            reminder.message = reminder.event.create_message(
+                                reminder.turn
+                            )
+                            reminder.save(update_fields=['message'])
+
+                # Messages are sent together out of the transaction, so a
+                # batch reuses the SMTP connection of each company without
+                # holding the row locks.
+                processed_ids += [reminder.pk for reminder in reminders]
+                message_ids = [reminder.message_id for reminder in reminders]
+                Message.objects.send_many(
+                    Message.objects.filter(pk__in=message_ids)
+                )
+                sent_ids = set(Message.objects.filter(
+                    pk__in=message_ids, date_send__isnull=False
+                ).values_list('pk', flat=True))
+
+                for reminder in reminders:
+                    if reminder.message_id in sent_ids:
+                        reminder.set_send()
+                        send += 1
+                    else:
+                        failed += 1
+        finally:
+            cache.delete(REMINDER_LOCK_KEY)
+
+        return dict(total=send + failed, send=send, failed=failed)
+
+
+class Reminder(models.Model):
+    event = models.ForeignKey(
+        'core.Event', editable=False, on_delete=models.CASCADE,
+        db_index=True, verbose_name=_("event")
+    )
+    turn = models.PositiveIntegerField(
+        editable=False, verbose_name=_("turn")
+    )
+    date_fire = models.DateTimeField(
+        editable=False, verbose_name=_("fire date")
+    )
+    date_send = models.DateTimeField(
+        blank=True, null=True, editable=False, verbose_name=_("send date")
+    )
+    message = models.ForeignKey(
+        'core.Message', blank=True, null=True, editable=False,
+        on_delete=models.SET_NULL, db_index=True, verbose_name=_("message")
+    )
+
+    objects = ReminderManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['date_fire'], condition=Q(date_send__isnull=True),
+                name='core_reminder_pending_idx'
+            ),
+        ]
+        ordering = ['date_fire', ]
+        unique_together = ('event', 'turn')
+        verbose_name = _("reminder")
+        verbose_name_plural = _("reminders")
+
+    def __str__(self):
+        return "%s (%s)" % (
+            self.event, self.event.get_notify_display(self.turn)
+        )
+
+    def get_absolute_url(self):
+        return self.parent.get_absolute_url()
+
+    def is_send(self):
+        return True if self.date_send else False
+    is_send.boolean = True
+
+    @property
+    def parent(self):
+        return self.event
+
+    def send(self):
+        response = self.event.send(self.turn)
+
+        if response[0] == LEVEL_SUCCESS:
+            self.set_send()
+
+        return response
+
+    def set_send(self):
+        self.date_send = timezone.now()
+        self.save(update_fields=['date_send'])
+        self.event.notified = ','.join(
+            self.event.notified_list + [str(self.turn)]
+        )
+        self.event.save(update_fields=['notified'])
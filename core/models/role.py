@@ -19,6 +19,11 @@ class Role(get_active_mixin(editable=True), AuditableMixin):
     )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'name'], name='core_role_company_name_idx'
+            ),
+        ]
         ordering = ['name', ]
         verbose_name = _("role")
         verbose_name_plural = _("roles")
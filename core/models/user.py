@@ -1,13 +1,16 @@
+from collections import OrderedDict
 from datetime import timedelta
 import hashlib
+from itertools import chain
 import pytz
 import random
 
-from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.auth.models import AbstractUser, Permission, UserManager
 from django.contrib.contenttypes.models import ContentType
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import models, transaction
 from django.db.models import signals
 from django.urls import reverse_lazy
 from django.utils import timezone
@@ -18,9 +21,16 @@ from boilerplate.mail import SendEmail
 from boilerplate.signals import add_view_permissions
 from rest_framework.authtoken.models import Token
 
+from core.cache import bump_version, get_version
 from core.constants import (
-    ACCOUNT_ACTIVATION_HOURS, LEVEL_ERROR, LEVEL_SUCCESS
+    ACCOUNT_ACTIVATION_HOURS, LEVEL_ERROR, LEVEL_SUCCESS,
+    NOTIFICATION_SUMMARY_THRESHOLD, PERMISSION_CACHE_TIMEOUT
 )
+from core.models.colaborator import Colaborator
+from core.models.notification import (
+    change_unread_count, publish_notifications_on_commit
+)
+from core.models.role import Role
 from core import tasks
 
 
@@ -91,11 +101,12 @@ class User(AbstractUser):
 
     def as_colaborator(self, company):
         if any([self.is_staff, self.is_superuser]):
-            colaborator, created = self.colaborator_set.get_or_create(
-                company=company,
-                defaults={'is_active': True}
-            )
-            return colaborator
+            # Staff members get a transient colaborator instead of a row
+            # written on their first visit to every company.
+            try:
+                return self.colaborator_set.get(company=company)
+            except ObjectDoesNotExist:
+                return Colaborator(user=self, company=company, is_active=True)
 
         try:
             return self.colaborator_set.get(
@@ -166,13 +177,9 @@ class User(AbstractUser):
         )
         self.save(update_fields=['activation_key', 'date_key_expiration'])
 
-        task = tasks.user_task
-
-        if not settings.DEBUG:
-            task = task.delay
-
-        task(
-            company_id=self.company,
+        tasks.submit_task(
+            tasks.user_task,
+            company_id=None,
             task='key_send',
             pk=self.pk
         )
@@ -189,71 +196,97 @@ class User(AbstractUser):
         email.add_context_data('object', self)
         return email.send()
 
+    def _load_perms(self, company):
+        lookup = dict(user=self, company=company, is_active=True)
+        role_perms = Permission.objects.filter(**{
+            'role__colaborator__{}'.format(k): v for k, v in lookup.items()
+        }).values_list('content_type__app_label', 'codename')
+        user_perms = Permission.objects.filter(**{
+            'colaborator__{}'.format(k): v for k, v in lookup.items()
+        }).values_list('content_type__app_label', 'codename')
+
+        return frozenset(
+            '{}:{}'.format(app_label, codename)
+            for app_label, codename in chain(role_perms, user_perms)
+        )
+
     def get_perms(self, company):
         if not company or not company.is_active:
-            return []
+            return frozenset()
 
-        try:
-            role_perms = self.colaborator_set \
-                .get(company=company, is_active=True) \
-                .roles.all() \
-                .select_related('permissions__content_type') \
-                .values(
-                    'permissions__content_type__app_label',
-                    'permissions__codename'
-                )
-
-            user_perms = self.colaborator_set \
-                .get(company=company, is_active=True) \
-                .permissions.all() \
-                .select_related('content_type') \
-                .values('content_type__app_label', 'codename')
-
-            role_data = [
-                '{}:{}'.format(
-                    c['permissions__content_type__app_label'],
-                    c['permissions__codename']
-                ) for c in role_perms
-            ]
+        if not hasattr(self, '_company_perms'):
+            self._company_perms = {}
+        if company.pk in self._company_perms:
+            return self._company_perms[company.pk]
 
-            user_data = [
-                '{}:{}'.format(
-                    c['content_type__app_label'], c['codename']
-                ) for c in user_perms
-            ]
+        version = get_version(get_perms_version_key(company.pk))
+        key = get_perms_cache_key(self.pk, company.pk)
+        perms = cache.get(key, version=version)
 
-            return role_data + list(set(user_data) - set(role_data))
-        except Exception:
-            if settings.DEBUG:
-                raise
-            return []
+        if perms is None:
+            try:
+                perms = self._load_perms(company)
+            except Exception:
+                if settings.DEBUG:
+                    raise
+                return frozenset()
+            cache.set(key, perms, PERMISSION_CACHE_TIMEOUT, version=version)
+
+        self._company_perms[company.pk] = perms
+        return perms
 
     def add_notification(self, company, model, obj, response):
-        level, content = response
+        return self.add_notifications(company, model, obj, [response])[0]
+
+    def add_notifications(
+        self, company, model, obj, responses,
+        summary_threshold=NOTIFICATION_SUMMARY_THRESHOLD
+    ):
+        """
+        Create a notification per ``(level, content)`` response with a single
+        insert. Levels with more than ``summary_threshold`` responses get one
+        summary notification instead.
+        """
+        Notification = self.notification_set.model
 
         if hasattr(obj, 'pk'):
-            self.notification_set.create(
-                company=company,
-                model=obj,
-                level=level,
-                content=content,
-                destination=obj.get_absolute_url(),
-            )
+            kwargs = dict(model=obj)
+            destination = obj.get_absolute_url()
         else:
-            ct = ContentType.objects.get(
-                app_label=model._meta.app_label,
-                model=model._meta.model_name
+            kwargs = dict(
+                content_type=ContentType.objects.get_for_model(model)
             )
-            destination = reverse_lazy('{}:{}_list'.format(
-                model._meta.app_label, model._meta.model_name
+            destination = reverse_lazy('panel:{}_list'.format(
+                model._meta.model_name
             ))
-            self.notification_set.create(
-                company=company,
-                contenttype=ct,
-                level=level,
-                content=content,
-                destination=destination,
-            )
+
+        levels = OrderedDict()
+        for level, content in responses:
+            levels.setdefault(level, []).append(content)
+
+        notifications = []
+        for level, contents in levels.items():
+            if summary_threshold and len(contents) > summary_threshold:
+                contents = [(_("%(count)d results: %(content)s") % dict(
+                    count=len(contents),
+                    content=contents[0],
+                ))[:250]]
+
+            notifications += [
+                Notification(
+                    company=company,
+                    user=self,
+                    level=level,
+                    content=content,
+                    destination=destination,
+                    **kwargs
+                ) for content in contents
+            ]
+
+        notifications = Notification.objects.bulk_create(notifications)
+        change_unread_count(self.pk, company.pk, len(notifications))
+        publish_notifications_on_commit(self.pk, company.pk, notifications)
+        return notifications
 
     def notifications_unread(self):
         return self.notification_set.filter(
@@ -261,6 +294,11 @@ class User(AbstractUser):
             date_read__isnull=True
         )
 
+    def notifications_unread_count(self, company):
+        return self.notification_set.model.objects.get_unread_count(
+            company, self
+        )
+
     def has_company_perm(self, company, perm, obj=None):
         if self.is_superuser:
             return True
@@ -279,9 +317,60 @@ class User(AbstractUser):
         elif self == company.user:
             return True
 
-        return all(
-            self.has_company_perm(company, perm, obj) for perm in perm_list
+        return self.get_perms(company).issuperset(perm_list)
+
+
+def get_perms_cache_key(user_id, company_id):
+    return 'core.user.{}.company.{}.perms'.format(user_id, company_id)
+
+
+def get_perms_version_key(company_id):
+    return 'core.company.{}.perms.version'.format(company_id)
+
+
+def clear_perms_cache(company_ids):
+    version_keys = [
+        get_perms_version_key(company_id) for company_id in set(company_ids)
+    ]
+
+    for version_key in version_keys:
+        bump_version(version_key)
+
+    # Bump again once committed so requests that read the permissions before
+    # the commit don't keep them cached under the new version.
+    def bump_versions():
+        for version_key in version_keys:
+            bump_version(version_key)
+
+    transaction.on_commit(bump_versions)
+
+
+def m2m_changed_perms(sender, instance, action, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    # Colaborator and Role carry the company, reverse changes made from a
+    # Permission need to look it up on the other side.
+    if hasattr(instance, 'company_id'):
+        company_ids = [instance.company_id]
+    elif action == 'pre_clear':
+        field_name = next(
+            field.name for field in model._meta.many_to_many
+            if field.remote_field.through is sender
         )
+        company_ids = model.objects.filter(
+            **{field_name: instance}
+        ).values_list('company_id', flat=True)
+    else:
+        company_ids = model.objects.filter(
+            pk__in=pk_set
+        ).values_list('company_id', flat=True)
+
+    clear_perms_cache(company_ids)
+
+
+def post_change_perms(sender, instance, **kwargs):
+    clear_perms_cache([instance.company_id])
 
 
 def post_save_user(sender, instance, created, **kwargs):
@@ -294,3 +383,13 @@ def post_save_user(sender, instance, created, **kwargs):
 
 signals.post_save.connect(post_save_user, sender=User)
 signals.post_migrate.connect(add_view_permissions)
+signals.m2m_changed.connect(
+    m2m_changed_perms, sender=Colaborator.roles.through
+)
+signals.m2m_changed.connect(
+    m2m_changed_perms, sender=Colaborator.permissions.through
+)
+signals.m2m_changed.connect(m2m_changed_perms, sender=Role.permissions.through)
+signals.post_delete.connect(post_change_perms, sender=Colaborator)
+signals.post_delete.connect(post_change_perms, sender=Role)
+signals.post_save.connect(post_change_perms, sender=Colaborator)
@@ -1,11 +1,83 @@
+from itertools import groupby
+from operator import itemgetter
 import uuid
 
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from core.cache import CacheQueue
+from core.constants import (
+    VISIT_BATCH_SIZE, VISIT_BUFFER_TIMEOUT, VISIT_FLUSH_TIMEOUT
+)
 from core.models.mixins import AuditableMixin
 
 
+VISIT_BUFFER = CacheQueue('core.visit.buffer', VISIT_BUFFER_TIMEOUT)
+
+
+class VisitManager(models.Manager):
+    def buffer(self, link_id, ip_address, date=None):
+        """
+        Queue a visit to be written by ``flush_buffer``.
+        """
+        return VISIT_BUFFER.push(
+            (link_id, ip_address, date or timezone.now())
+        )
+
+    def flush_buffer(self, batch_size=VISIT_BATCH_SIZE):
+        """
+        Write the buffered visits in batches of ``batch_size``.
+        """
+        from core.models import Link
+
+        if not VISIT_BUFFER.lock(VISIT_FLUSH_TIMEOUT):
+            return 0
+
+        total = 0
+        try:
+            while True:
+                position, items = VISIT_BUFFER.peek(batch_size)
+
+                if not items:
+                    VISIT_BUFFER.ack(position)
+                    break
+
+                link_ids = set(
+                    Link.objects.filter(
+                        pk__in=set(item[0] for item in items)
+                    ).values_list('pk', flat=True)
+                )
+                items = [item for item in items if item[0] in link_ids]
+
+                with transaction.atomic():
+                    visits = self.bulk_create([
+                        self.model(link_id=link_id, ip_address=ip_address)
+                        for link_id, ip_address, date in items
+                    ])
+
+                    # auto_now_add overrides the click time on insert.
+                    for visit, item in zip(visits, items):
+                        visit.date_creation = item[2]
+                    self.bulk_update(visits, ['date_creation'])
+
+                    for link_id, dates in groupby(
+                        sorted((item[0], item[2]) for item in items),
+                        itemgetter(0)
+                    ):
+                        dates = [item[1] for item in dates]
+                        Link.objects.filter(pk=link_id).add_visits(
+                            len(dates), dates[0], dates[-1]
+                        )
+
+                VISIT_BUFFER.ack(position)
+                total += len(visits)
+        finally:
+            VISIT_BUFFER.unlock()
+
+        return total
+
+
 class Visit(AuditableMixin):
     id = models.UUIDField(
         default=uuid.uuid4, primary_key=True, editable=False,
@@ -19,7 +91,15 @@ class Visit(AuditableMixin):
         protocol='both', verbose_name=_("ip address")
     )
 
+    objects = VisitManager()
+
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['link', 'date_creation', 'id'],
+                name='core_visit_link_date_idx'
+            ),
+        ]
         ordering = ['date_creation', ]
         verbose_name = _("visit")
         verbose_name_plural = _("visits")
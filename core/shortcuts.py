@@ -1,3 +1,19 @@
 def get_current_company(request):
     from core.models import Company
     return Company.objects.get_current(request)
+
+
+def get_current_colaborator(request, user=None):
+    """
+    Return the colaborator of ``user`` (defaults to the request user) in the
+    request company, loading it at most once per request.
+    """
+    user = user or request.user
+    # Share the registry between a DRF request and the request it wraps.
+    request = getattr(request, '_request', request)
+
+    if not hasattr(request, '_colaborators'):
+        request._colaborators = {}
+    if user.pk not in request._colaborators:
+        request._colaborators[user.pk] = user.as_colaborator(request.company)
+    return request._colaborators[user.pk]
@@ -1,49 +1,240 @@
+import hashlib
+import json
+import time
 import traceback
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import mail_admins
 
 from celery.schedules import crontab
+from celery.signals import before_task_publish, task_prerun
 from celery.utils.log import get_task_logger
 
+from core.constants import (
+    JOB_CHUNK_MAX_RETRIES, QUEUE_LATENCY_TIMEOUT, TASK_LOCK_TIMEOUT
+)
 from myapp.celery import app
 
 
 logger = get_task_logger(__name__)
 
 
+TASK_ACTIONS = {}
+
+
+def get_queue_latency_key(queue, name):
+    return 'core.queue.{}.latency.{}'.format(queue, name)
+
+
+def get_queue_latency(queue):
+    """
+    Return the count, average and maximum wait in milliseconds of the tasks
+    started from ``queue`` since the stats were reset.
+    """
+    stats = cache.get_many([
+        get_queue_latency_key(queue, name)
+        for name in ('count', 'total', 'max')
+    ])
+    count = stats.get(get_queue_latency_key(queue, 'count'), 0)
+    total = stats.get(get_queue_latency_key(queue, 'total'), 0)
+
+    return dict(
+        count=count,
+        average=total / count if count else 0,
+        max=stats.get(get_queue_latency_key(queue, 'max'), 0),
+    )
+
+
+def record_queue_latency(queue, latency):
+    """
+    Add a wait of ``latency`` seconds to the stats of ``queue``.
+    """
+    latency = int(latency * 1000)
+
+    for name, value in (('count', 1), ('total', latency)):
+        key = get_queue_latency_key(queue, name)
+        if not cache.add(key, value, QUEUE_LATENCY_TIMEOUT):
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, QUEUE_LATENCY_TIMEOUT)
+
+    # The maximum is not atomic, an approximation is enough to size workers.
+    key = get_queue_latency_key(queue, 'max')
+    if latency > cache.get(key, 0):
+        cache.set(key, latency, QUEUE_LATENCY_TIMEOUT)
+
+
+def reset_queue_latency(queue):
+    cache.delete_many([
+        get_queue_latency_key(queue, name)
+        for name in ('count', 'total', 'max')
+    ])
+
+
+def get_task_action(model, task):
+    """
+    Return the attribute path of ``task`` once it is checked to resolve to
+    a callable of ``model``. Paths are validated once per worker.
+    """
+    key = (model, task)
+
+    if key not in TASK_ACTIONS:
+        entity = model
+        path = tuple(task.split('.'))
+
+        for name in path:
+            entity = getattr(entity, name)
+
+        if not callable(entity):
+            raise Exception("{}: task not callable.".format(task))
+
+        TASK_ACTIONS[key] = path
+
+    return TASK_ACTIONS[key]
+
+
+def get_task_lock_key(
+    task_name, company_id=None, pk=None, task=None, data=None, **kwargs
+):
+    payload = json.dumps(
+        [company_id, data], sort_keys=True, default=str
+    ).encode('utf-8')
+    return 'core.task.{}.{}.{}.{}'.format(
+        task_name, pk or '', task or '', hashlib.sha1(payload).hexdigest()
+    )
+
+
+def submit_task(celery_task, queue=None, **kwargs):
+    """
+    Send ``celery_task`` unless an identical one is still pending. Return
+    whether it was sent, duplicates are dropped before reaching the broker.
+    """
+    lock_key = get_task_lock_key(celery_task.name, **kwargs)
+
+    if not cache.add(lock_key, True, TASK_LOCK_TIMEOUT):
+        logger.info("{}: dropped duplicated task".format(lock_key))
+        return False
+
+    kwargs['lock_key'] = lock_key
+
+    if settings.DEBUG:
+        celery_task(**kwargs)
+        return True
+
+    try:
+        celery_task.apply_async(kwargs=kwargs, queue=queue)
+    except Exception:
+        # Nothing will run to release it, don't block retries until timeout.
+        cache.delete(lock_key)
+        raise
+    return True
+
+
+def get_task_snapshot(obj, fields):
+    """
+    Serialize ``fields`` of ``obj`` so a task can rebuild it without a query.
+    """
+    snapshot = {}
+
+    for name in fields:
+        field = obj._meta.get_field(name)
+        snapshot[field.attname] = field.value_to_string(obj)
+
+    return snapshot
+
+
+def load_task_object(model, pk, snapshot=None, related=()):
+    """
+    Return the ``pk`` instance of ``model``, built from ``snapshot`` when
+    given. Fields left out of the snapshot are loaded on access.
+    """
+    if not snapshot:
+        return model.objects.select_related(*related).get(pk=pk)
+
+    values = dict(snapshot, **{model._meta.pk.attname: pk})
+    fields = [
+        field for field in model._meta.concrete_fields
+        if field.attname in values
+    ]
+    return model.from_db(
+        None,
+        [field.attname for field in fields],
+        [field.to_python(values[field.attname]) for field in fields]
+    )
+
+
 def model_task(
-    model, company_id, task, user_request_id=None, pk=None, data=None
+    model, company_id, task, user_request_id=None, pk=None, data=None,
+    snapshot=None, lock_key=None
+):
+    try:
+        return run_model_task(
+            model, company_id, task, user_request_id, pk, data, snapshot
+        )
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
+
+
+def run_model_task(
+    model, company_id, task, user_request_id=None, pk=None, data=None,
+    snapshot=None
 ):
     from core.models import Company, User
 
-    if company_id:
-        company = Company.objects.get(id=company_id)
-    else:
-        company = None
+    start = time.perf_counter()
+    path = get_task_action(model, task)
     data = data or {}
 
     if not isinstance(data, dict):
         raise Exception("Data is not a dict {}".format(data))
 
-    data['company'] = company
+    obj = None
+    company = None
     user_request = None
 
-    if user_request_id:
+    # The target is loaded with its company and user when it has them, so
+    # the usual case costs a single query.
+    if pk:
+        related = [
+            field.name for field in model._meta.concrete_fields
+            if field.name in ('company', 'user') and field.is_relation
+        ]
+        obj = load_task_object(model, pk, snapshot, related)
+
+        if model is Company:
+            company = obj if obj.pk == company_id else None
+        elif company_id and 'company' in related and not snapshot:
+            company = obj.company if obj.company_id == company_id else None
+
+        if model is User:
+            user_request = obj if obj.pk == user_request_id else None
+        elif user_request_id and 'user' in related and not snapshot:
+            user_request = (
+                obj.user if obj.user_id == user_request_id else None
+            )
+
+    if company_id and company is None:
+        company = Company.objects.get(id=company_id)
+    if user_request_id and user_request is None:
         user_request = User.objects.get(id=user_request_id)
+
+    data['company'] = company
+    if user_request:
         data['user_request'] = user_request
 
-    if pk:
-        obj = model.objects.get(pk=pk)
-        entity = obj
-    else:
+    if obj is None:
         obj = '%s' % model.__name__
         entity = model
+    else:
+        entity = obj
 
-    for mod in task.split('.'):
+    for mod in path:
         entity = getattr(entity, mod)
 
-    if not callable(entity):
-        raise Exception("{}: task not callable.".format(task))
+    setup = time.perf_counter() - start
 
     try:
         logger.info("{0}: running task {1}".format(obj, task))
@@ -76,13 +267,17 @@ Traceback:
         )
         raise
 
+    logger.info("{0}: task {1} setup {2:.2f}ms, run {3:.2f}ms".format(
+        obj, task, setup * 1000, (time.perf_counter() - start - setup) * 1000
+    ))
+
     if isinstance(response, list):
-        for item in response:
-            user_request.add_notification(
+        if user_request:
+            user_request.add_notifications(
                 company=company,
                 model=model,
                 obj=obj,
-                response=item,
+                responses=response,
             )
     else:
         if user_request:
@@ -126,6 +321,26 @@ def user_task(**kwargs):
     return model_task(model=Model, **kwargs)
 
 
+@app.task(
+    bind=True, name='job_chunk_task', acks_late=True,
+    autoretry_for=(Exception, ), max_retries=JOB_CHUNK_MAX_RETRIES,
+    retry_backoff=True
+)
+def job_chunk_task(self, chunk_id):
+    from core.models import JobChunk
+
+    chunk = JobChunk.objects.select_related(
+        'job__content_type'
+    ).get(pk=chunk_id)
+
+    try:
+        return chunk.run()
+    except Exception:
+        if self.request.retries >= self.max_retries:
+            chunk.set_failed()
+        raise
+
+
 @app.task(name='check_company')
 def check_company():
     from core.models import Company
@@ -138,8 +353,41 @@ def check_event():
     Event.check_all()
 
 
+@app.task(name='flush_visits')
+def flush_visits():
+    from core.models import Visit
+    return Visit.objects.flush_buffer()
+
+
+@app.task(name='reconcile_notifications')
+def reconcile_notifications():
+    from core.models import Notification
+    return Notification.objects.reconcile_unread_counts()
+
+
 app.add_periodic_task(
     crontab(day_of_week='*', hour='7', minute='0'),
     check_company
 )
 app.add_periodic_task(crontab(minute='*/5'), check_event)
+app.add_periodic_task(crontab(minute='*'), flush_visits)
+app.add_periodic_task(crontab(minute='*/15'), reconcile_notifications)
+
+
+def stamp_task_publish(headers=None, **kwargs):
+    headers.setdefault('date_publish', time.time())
+
+
+def record_task_latency(task=None, **kwargs):
+    request = task.request
+    date_publish = getattr(request, 'date_publish', None) or (
+        request.headers or {}
+    ).get('date_publish')
+    queue = (request.delivery_info or {}).get('routing_key')
+
+    if date_publish and queue:
+        record_queue_latency(queue, time.time() - date_publish)
+
+
+before_task_publish.connect(stamp_task_publish)
+task_prerun.connect(record_task_latency)
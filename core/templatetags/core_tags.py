@@ -1,6 +1,8 @@
 from django import template
 from django.urls import resolve, reverse_lazy
 
+from core.shortcuts import get_current_colaborator
+
 
 register = template.Library()
 
@@ -26,19 +28,26 @@ def api_list_view(context, model, parent_obj=None):
         )
 
 
+@register.simple_tag(takes_context=True)
+def notifications_unread_count(context):
+    request = context['request']
+
+    if not request.user.is_authenticated or not request.company:
+        return 0
+    return request.user.notifications_unread_count(request.company)
+
+
 @register.simple_tag(takes_context=True)
 def user_permissions_url(context, user):
-    company = context['request'].company
-    colaborator = user.as_colaborator(company)
-    if colaborator:
+    colaborator = get_current_colaborator(context['request'], user)
+    if not colaborator:
         return ''
-    return reverse_lazy('public:user_permissions', args=[colaborator.pk])
+    return reverse_lazy('panel:user_permissions', args=[user.pk])
 
 
 @register.simple_tag(takes_context=True)
 def user_remove_url(context, user):
-    company = context['request'].company
-    colaborator = user.as_colaborator(company)
-    if colaborator:
+    colaborator = get_current_colaborator(context['request'], user)
+    if not colaborator:
         return ''
-    return reverse_lazy('public:user_remove', args=[colaborator.pk])
+    return reverse_lazy('panel:user_delete', args=[user.pk])
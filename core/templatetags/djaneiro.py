@@ -11,6 +11,7 @@ from boilerplate.templatetags.boilerplate import url_replace
 
 from core.constants import ACTIONS
 from core.models import Company
+from core.routes import reverse_action
 
 
 register = template.Library()
@@ -95,20 +96,20 @@ def build_url(
     **kwargs
 ):
     args = []
-    url_name = app_name + ':'
+    model = None
+    parent = None
 
     if parent_object:
-        url_name += parent_object.__class__.__name__.lower() + '_'
+        parent = parent_object.__class__.__name__.lower()
         args.append(parent_object.pk)
 
     if object:
-        url_name += object.__class__.__name__.lower()
+        model = object.__class__.__name__.lower()
         args.append(object.pk)
     elif object_list is not None:
-        url_name += object_list.model.__name__.lower()
-    url_name += '_' + action
+        model = object_list.model.__name__.lower()
 
-    return reverse_lazy(url_name, args=args)
+    return reverse_action(app_name, action, model, parent, args)
 
 
 @register.simple_tag(takes_context=True)
@@ -1,12 +1,49 @@
+import base64
+from datetime import timedelta
+from importlib import import_module
+import json
+import re
+from smtplib import SMTPException
+from unittest import mock
+
+from django.apps import apps as django_apps
 from django.contrib.messages.constants import SUCCESS
 from django.contrib.messages.storage import default_storage
-from django.contrib.auth.models import AnonymousUser
-from django.core.exceptions import PermissionDenied
+from django.contrib.auth.models import AnonymousUser, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import connection
+from django.db.models import ProtectedError
 from django.test import override_settings, RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
 
+from core.api.pagination import KeysetPagination
+from core.cache import CacheQueue, bump_version
 from core.models import User
-from core.constants import LEVEL_ERROR, LEVEL_SUCCESS
-from core.models import Company
+from core.models.company import PERMISSION_VERSION_KEY
+from core.consumers import NotificationConsumer, publish_notifications
+from core.constants import (
+    EVENT_TASK, LEVEL_ERROR, LEVEL_SUCCESS, LEVEL_WARNING
+)
+from core.models import (
+    Company, Event, Invite, Job, Link, Notification, Reminder, Visit
+)
+from core.routes import reverse_action
+from core.tasks import (
+    get_queue_latency, get_task_action, get_task_lock_key, get_task_snapshot,
+    link_task, model_task, record_queue_latency, reset_queue_latency,
+    submit_task, user_task
+)
+from core.utils import preload_templates, stream_csv, stream_jsonl
+from panel.views import LinkDeleteAllView
 from public import views
 
 
@@ -84,6 +121,21 @@ class InviteTestCase(CoreTestCase):
         level, response = self.invite.send()
         self.assertEqual(level, LEVEL_ERROR)
 
+    def test_send_pending(self):
+        self.company.invite_set.create(
+            name='bcooper', email='bcooper@test.com'
+        )
+
+        level, response = Invite.objects.send_pending(
+            self.company, 'https', 'test.com'
+        )
+
+        self.assertEqual(level, LEVEL_SUCCESS)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(
+            self.company.invite_set.filter(date_send__isnull=True).exists()
+        )
+
 
 class InviteViewTestCase(CoreTestCase):
     def setUp(self):
@@ -100,3 +152,922 @@ class InviteViewTestCase(CoreTestCase):
         self.assertEqual(response.status_code, 302)
         for message in request._messages:
             self.assertEqual(message.level, SUCCESS)
+
+
+class CompanyCacheTestCase(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.company.domain = 'company.test'
+        self.company.save()
+        Company.objects.clear_cache()
+
+    def test_get_current_cached(self):
+        request = self.factory.get('/fake-path', HTTP_HOST='company.test')
+        self.assertEqual(Company.objects.get_current(request), self.company)
+
+        with self.assertNumQueries(0):
+            company = Company.objects.get_current(request)
+
+        self.assertEqual(company, self.company)
+        self.assertEqual(Company.objects.cache_info()['misses'], 1)
+
+    def test_get_current_invalidated_on_save(self):
+        request = self.factory.get('/fake-path', HTTP_HOST='company.test')
+        Company.objects.get_current(request)
+
+        self.company.name = 'Renamed'
+        self.company.save()
+
+        company = Company.objects.get_current(request)
+        self.assertEqual(company.name, 'Renamed')
+
+    def test_get_current_normalizes_host(self):
+        request = self.factory.get(
+            '/fake-path', HTTP_HOST='WWW.Company.test:8000'
+        )
+        self.assertEqual(Company.objects.get_current(request), self.company)
+
+    def test_migration_normalized_domain_collision(self):
+        migration = import_module(
+            'core.migrations.0002_company_normalized_domain'
+        )
+        self.company.domain = 'foo.com'
+        self.company.save()
+        other = Company.objects.create(
+            name='Other', email='other@test.com', user=self.user,
+            domain='bar.com'
+        )
+        Company.objects.filter(pk=other.pk).update(domain='WWW.Foo.com')
+
+        with self.assertRaisesMessage(ValueError, 'WWW.Foo.com, foo.com'):
+            migration.set_normalized_domain(django_apps, None)
+
+        Company.objects.filter(pk=other.pk).update(domain='bar.com')
+        migration.set_normalized_domain(django_apps, None)
+        self.assertEqual(
+            Company.objects.get(pk=other.pk).normalized_domain, 'bar.com'
+        )
+
+    def test_validate_unique_normalized_domain(self):
+        company = Company(name='Other', domain='WWW.company.test')
+
+        with self.assertRaises(ValidationError) as context:
+            company.validate_unique()
+        self.assertIn('domain', context.exception.message_dict)
+
+    def test_get_current_unknown_host_cached(self):
+        request = self.factory.get('/fake-path', HTTP_HOST='unknown.test')
+
+        with self.assertRaises(Company.DoesNotExist):
+            Company.objects.get_current(request)
+
+        with self.assertNumQueries(0):
+            with self.assertRaises(Company.DoesNotExist):
+                Company.objects.get_current(request)
+
+
+class PermissionCacheTestCase(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.permission = Permission.objects.get(
+            content_type__app_label='core', codename='view_link'
+        )
+        self.role = self.company.role_set.create(name='Viewer')
+        self.colaborator.colaborator_set.get(
+            company=self.company
+        ).roles.add(self.role)
+
+    def test_has_company_perm_cached(self):
+        self.role.permissions.add(self.permission)
+        user = User.objects.get(pk=self.colaborator.pk)
+        self.assertTrue(user.has_company_perm(self.company, 'core:view_link'))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                user.has_company_perm(self.company, 'core:view_link')
+            )
+            self.assertFalse(
+                user.has_company_perm(self.company, 'core:delete_link')
+            )
+
+    def test_has_company_perm_invalidated(self):
+        user = User.objects.get(pk=self.colaborator.pk)
+        self.assertFalse(user.has_company_perm(self.company, 'core:view_link'))
+
+        self.role.permissions.add(self.permission)
+
+        user = User.objects.get(pk=self.colaborator.pk)
+        self.assertTrue(user.has_company_perm(self.company, 'core:view_link'))
+
+
+class ReminderTestCase(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.company.event_set.create(
+            user=self.user,
+            date_start=timezone.now() + timedelta(hours=2),
+            notify='0,10',
+            type=EVENT_TASK,
+            content='Call back'
+        )
+
+    def test_event_schedules_reminders(self):
+        self.assertEqual(
+            sorted(self.event.reminder_set.values_list('turn', flat=True)),
+            [0, 10]
+        )
+
+    def test_send_due(self):
+        self.event.reminder_set.update(
+            date_fire=timezone.now() - timedelta(minutes=1)
+        )
+
+        response = Reminder.objects.send_due()
+
+        self.assertEqual(response['send'], 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(
+            self.event.reminder_set.filter(date_send__isnull=True).exists()
+        )
+
+    def test_send_due_retry(self):
+        self.event.reminder_set.update(
+            date_fire=timezone.now() - timedelta(minutes=1)
+        )
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=SMTPException
+        ):
+            response = Reminder.objects.send_due()
+
+        self.assertEqual(response['failed'], 2)
+        self.assertEqual(self.company.message_set.count(), 2)
+
+        # The next run sends the messages created by the failed one.
+        response = Reminder.objects.send_due()
+        self.assertEqual(response['send'], 2)
+        self.assertEqual(self.company.message_set.count(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_event_reschedules_reminders(self):
+        self.event.notify = '60'
+        self.event.save()
+
+        reminder = self.event.reminder_set.get()
+        self.assertEqual(reminder.turn, 60)
+        self.assertEqual(
+            reminder.date_fire,
+            self.event.date_start - timedelta(minutes=60)
+        )
+
+
+class MessageSendManyTestCase(CoreTestCase):
+    def test_send_many(self):
+        for email in ('first@test.com', 'second@test.com'):
+            self.company.message_set.create(
+                from_email='company@test.com',
+                to_email=email,
+                subject='Hello',
+                content='Hello there'
+            )
+
+        response = self.company.message_set.send_many()
+
+        self.assertEqual(response['send'], 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(
+            self.company.message_set.filter(date_send__isnull=True).exists()
+        )
+
+    def test_send_many_failed(self):
+        message = self.company.message_set.create(
+            from_email='company@test.com',
+            to_email='first@test.com',
+            subject='Hello',
+            content='Hello there'
+        )
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=SMTPException
+        ):
+            response = self.company.message_set.send_many()
+
+        message.refresh_from_db()
+        self.assertEqual(response['failed'], 1)
+        self.assertTrue(message.is_fail())
+        self.assertFalse(message.is_send())
+
+
+class MessageContentTestCase(CoreTestCase):
+    def test_is_html_stored(self):
+        message = self.company.message_set.create(
+            subject='Hello', content='<p>Hello <b>there</b></p>'
+        )
+        self.assertTrue(message.is_html)
+        self.assertEqual(message.content_raw, 'Hello there')
+
+    def test_get_content(self):
+        message = self.company.message_set.create(
+            subject='Hello',
+            content='<body><a href="https://example.com/">Visit</a></body>'
+        )
+        content_raw, content_html = message.get_content('https', 'test.com')
+        link = message.link_set.get()
+
+        self.assertEqual(content_raw, 'Visit')
+        self.assertIn(link.get_public_url('https', 'test.com'), content_html)
+        self.assertIn(message.get_pixel_url('https', 'test.com'), content_html)
+
+    def test_create_html_emails(self):
+        recipients = [
+            (dict(name=name), dict(to_email=email))
+            for name, email in (
+                ('George', 'gclooney@test.com'),
+                ('Bradley', 'bcooper@test.com'),
+            )
+        ]
+
+        with self.assertNumQueries(1):
+            messages = self.company.message_set.create_html_emails(
+                'Hello {{ name }}', 'panel/event/event_email.html', recipients
+            )
+
+        self.assertEqual(
+            [message.subject for message in messages],
+            ['Hello George', 'Hello Bradley']
+        )
+        self.assertEqual(self.company.message_set.count(), 2)
+        self.assertTrue(all(message.is_html for message in messages))
+
+    def test_get_content_links(self):
+        message = self.company.message_set.create(
+            subject='Hello',
+            content=(
+                '<body><a href="https://example.com/">Visit</a> '
+                '<a href="https://example.com/">Again</a> '
+                'https://example.org/</body>'
+            )
+        )
+
+        with self.assertNumQueries(2):
+            content_raw, content_html = message.get_content(
+                'https', 'test.com'
+            )
+        links = {
+            link.destination: link.get_public_url('https', 'test.com')
+            for link in message.link_set.all()
+        }
+
+        self.assertEqual(
+            set(links), {'https://example.com/', 'https://example.org/'}
+        )
+        self.assertEqual(
+            content_html.count(links['https://example.com/']), 2
+        )
+        self.assertIn(links['https://example.org/'], content_raw)
+        self.assertNotIn('\x00', content_raw + content_html)
+
+        message.get_content('https', 'test.com')
+        self.assertEqual(message.link_set.count(), 2)
+
+
+class VisitBufferTestCase(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.link = self.company.link_set.create(
+            destination='https://example.com/'
+        )
+
+    def test_flush_buffer(self):
+        date = timezone.now() - timedelta(minutes=5)
+        Visit.objects.buffer(self.link.pk, '127.0.0.1', date)
+        Visit.objects.buffer(self.link.pk, '127.0.0.2')
+
+        self.assertEqual(self.link.visit_set.count(), 0)
+        self.assertEqual(Visit.objects.flush_buffer(), 2)
+
+        visit = self.link.visit_set.get(ip_address='127.0.0.1')
+        self.assertEqual(visit.date_creation, date)
+        self.assertEqual(Visit.objects.flush_buffer(), 0)
+
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.total_visits, 2)
+        self.assertEqual(self.link.date_first_visit, date)
+        self.assertTrue(self.link.is_open())
+
+    def test_queue_waits_for_pending_slot(self):
+        queue = CacheQueue('core.tests.queue')
+        queue.push('first')
+        # A producer that took its slot but has not written the item yet.
+        index = cache.incr(queue.tail_key)
+        queue.push('third')
+
+        position, items = queue.peek(10)
+        self.assertEqual((position, items), (1, ['first']))
+        queue.ack(position)
+
+        cache.set(queue.get_item_key(index), 'second')
+        self.assertEqual(queue.peek(10), (3, ['second', 'third']))
+
+    def test_queue_skips_lost_slot(self):
+        queue = CacheQueue('core.tests.queue')
+        # The first slot was taken and its item expired.
+        cache.set(queue.tail_key, 1)
+        queue.push('second')
+
+        self.assertEqual(queue.peek(10), (0, []))
+        self.assertEqual(queue.peek(10), (2, ['second']))
+
+    def test_queue_skips_lost_slots(self):
+        queue = CacheQueue('core.tests.queue')
+        # Several consecutive items expired.
+        cache.set(queue.tail_key, 3)
+        queue.push('fourth')
+        cache.incr(queue.tail_key)
+        queue.push('sixth')
+
+        self.assertEqual(queue.peek(10), (0, []))
+        self.assertEqual(queue.peek(10), (6, ['fourth', 'sixth']))
+
+    def test_visit_counters(self):
+        self.link.visit_create('127.0.0.1')
+        self.link.visit_create('127.0.0.2')
+        self.company.link_set.update(total_visits=0)
+        self.company.link_set.update_visit_stats()
+
+        link = self.company.link_set.with_visit_stats().get()
+        self.assertEqual(link.total_visits, 2)
+        self.assertEqual(link.total_visits, link.visit_count)
+        self.assertEqual(link.date_first_visit, link.visit_first)
+        self.assertEqual(link.date_last_visit, link.visit_last)
+
+
+class MessagePixelTestCase(CoreTestCase):
+    def test_pixel(self):
+        message = self.company.message_set.create(
+            subject='Hello', content='Hello there'
+        )
+        request = self.factory.get('/')
+
+        with self.assertNumQueries(1):
+            response = views.MessagePixelView.as_view()(
+                request, pk=message.pk
+            )
+
+        message.refresh_from_db()
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertTrue(response.content.startswith(b'GIF89a'))
+        self.assertTrue(message.is_read())
+
+        date_read = message.date_read
+        views.MessagePixelView.as_view()(request, pk=message.pk)
+        message.refresh_from_db()
+        self.assertEqual(message.date_read, date_read)
+
+
+class PermissionChoicesTestCase(CoreTestCase):
+    def test_permission_choices(self):
+        choices = self.company.permission_choices
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.company.permission_choices, choices)
+        self.assertEqual(
+            [pk for pk, label in choices],
+            list(self.company.permission_queryset.values_list('pk', flat=True))
+        )
+
+    def test_permission_choices_invalidation(self):
+        link = Permission.objects.get(codename='view_link')
+        self.company.get_permission_ids()
+
+        permission = Permission.objects.create(
+            codename='export_link', name='Can export link',
+            content_type=link.content_type
+        )
+        self.assertIn(permission.pk, self.company.get_permission_ids())
+
+    def test_permission_choices_shared_version(self):
+        cache.clear()
+        link = Permission.objects.get(codename='view_link')
+        self.company.get_permission_ids()
+
+        # Changes seen by another process only reach this one through the
+        # shared version.
+        Permission.objects.bulk_create([Permission(
+            codename='export_link', name='Can export link',
+            content_type=link.content_type
+        )])
+        permission = Permission.objects.get(codename='export_link')
+        self.assertNotIn(permission.pk, self.company.get_permission_ids())
+
+        bump_version(PERMISSION_VERSION_KEY)
+        self.assertIn(permission.pk, self.company.get_permission_ids())
+
+
+class RouteTestCase(CoreTestCase):
+    def test_reverse_action(self):
+        link = self.company.link_set.create(
+            destination='https://example.com/'
+        )
+
+        self.assertEqual(
+            reverse_action('panel', 'list', 'link'),
+            reverse('panel:link_list')
+        )
+        self.assertEqual(
+            reverse_action('panel', 'change', 'link', args=[link.pk]),
+            reverse('panel:link_change', args=[link.pk])
+        )
+        self.assertEqual(
+            reverse_action('panel', 'delete', 'user', args=[self.user.pk]),
+            reverse('panel:user_delete', args=[self.user.pk])
+        )
+
+
+class ExportTestCase(CoreTestCase):
+    def test_stream(self):
+        for destination in ('https://example.com/', 'https://example.org/'):
+            self.company.link_set.create(destination=destination)
+
+        fields = ('destination', 'total_visits')
+        rows = self.company.link_set.order_by('destination').values_list(
+            *fields
+        ).iterator(chunk_size=1)
+
+        self.assertEqual(''.join(stream_csv(fields, rows)), (
+            'destination,total_visits\r\n'
+            'https://example.com/,0\r\n'
+            'https://example.org/,0\r\n'
+        ))
+        self.assertEqual(
+            list(stream_jsonl(fields, [('https://example.com/', 0)])),
+            ['{"destination": "https://example.com/", "total_visits": 0}\n']
+        )
+
+
+class KeysetPaginationTestCase(CoreTestCase):
+    def paginate(self, url):
+        paginator = KeysetPagination()
+        results = paginator.paginate_queryset(
+            self.company.link_set.all(), Request(self.factory.get(url))
+        )
+        return paginator, [link.destination for link in results]
+
+    def test_paginate(self):
+        for i in range(3):
+            self.company.link_set.create(
+                destination='https://example.com/{}/'.format(i)
+            )
+
+        paginator, first = self.paginate('/?limit=2')
+        self.assertEqual(first, [
+            'https://example.com/2/', 'https://example.com/1/'
+        ])
+        self.assertIsNone(paginator.get_previous_link())
+        self.assertNotIn('count', paginator.get_paginated_response([]).data)
+
+        paginator, second = self.paginate(paginator.get_next_link())
+        self.assertEqual(second, ['https://example.com/0/'])
+        self.assertIsNone(paginator.get_next_link())
+
+        paginator, previous = self.paginate(paginator.get_previous_link())
+        self.assertEqual(previous, first)
+
+    def test_paginate_invalid_cursor(self):
+        for pk in ('not-a-uuid', None, ['list']):
+            cursor = base64.urlsafe_b64encode(json.dumps(
+                [timezone.now().isoformat(), pk, False]
+            ).encode()).decode('ascii')
+
+            with self.assertRaises(NotFound):
+                self.paginate('/?cursor={}'.format(cursor))
+
+
+class QueryPlanTestCase(CoreTestCase):
+    """
+    Fail when a hot query of the panel or the tasks falls back to a
+    sequential scan.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for i in range(10):
+            self.company.event_set.create(
+                user=self.user,
+                date_start=timezone.now() + timedelta(days=i),
+                type=EVENT_TASK,
+                content='Event {}'.format(i)
+            )
+            self.company.link_set.create(
+                destination='https://example.com/{}/'.format(i)
+            )
+            self.company.message_set.create(
+                subject='Message {}'.format(i), content='Hello'
+            )
+            self.company.role_set.create(name='Role {}'.format(i))
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+                # Seeded tables are tiny, only check that an index is usable.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertIndexScan(self, queryset, index):
+        plan = queryset.explain()
+
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plan)
+        else:
+            for line in plan.splitlines():
+                self.assertIsNone(
+                    re.search(r'\bSCAN (TABLE )?\w+\s*$', line), plan
+                )
+        self.assertIn(index, plan)
+
+    def test_query_plans(self):
+        querysets = {
+            'event': (
+                self.company.event_set.all(),
+                'core_event_company_date_idx'
+            ),
+            'event_upcoming': (
+                Event.objects.filter(date_start__gte=timezone.now()),
+                'core_event_date_start_idx'
+            ),
+            'invite': (
+                self.company.invite_set.all(),
+                'core_invite_company_date_idx'
+            ),
+            'link': (
+                self.company.link_set.all(),
+                'core_link_company_date_idx'
+            ),
+            'message': (
+                self.company.message_set.all(),
+                'core_message_company_date_idx'
+            ),
+            'notification': (
+                self.company.notification_set.all(),
+                'core_notif_company_date_idx'
+            ),
+            # Unread notifications are only counted and updated, unordered.
+            'notification_unread': (
+                Notification.objects.filter(
+                    company=self.company,
+                    user=self.user,
+                    date_read__isnull=True
+                ).order_by(),
+                'core_notif_unread_idx'
+            ),
+            'reminder_due': (
+                Reminder.objects.filter(
+                    date_send__isnull=True,
+                    date_fire__lte=timezone.now()
+                ).order_by('date_fire'),
+                'core_reminder_pending_idx'
+            ),
+            'role': (
+                self.company.role_set.all(),
+                'core_role_company_name_idx'
+            ),
+            'visit': (
+                self.company.link_set.first().visit_set.all(),
+                'core_visit_link_date_idx'
+            ),
+        }
+
+        for name, (queryset, index) in querysets.items():
+            with self.subTest(name=name):
+                self.assertIndexScan(queryset, index)
+
+
+class NotificationCounterTestCase(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.link = self.company.link_set.create(
+            destination='https://example.com/'
+        )
+
+    def get_count(self):
+        return self.user.notifications_unread_count(self.company)
+
+    def test_unread_count(self):
+        self.assertEqual(self.get_count(), 0)
+
+        for i in range(2):
+            self.user.add_notification(
+                self.company, Link, self.link, (LEVEL_SUCCESS, 'Done')
+            )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_count(), 2)
+
+        notification = self.user.notification_set.first()
+        notification.set_read()
+        self.assertEqual(self.get_count(), 1)
+        notification.set_unread()
+        self.assertEqual(self.get_count(), 2)
+
+        Notification.objects.set_all_read(self.company, self.user)
+        self.assertEqual(self.get_count(), 0)
+
+    def test_reconcile(self):
+        self.user.add_notification(
+            self.company, Link, self.link, (LEVEL_SUCCESS, 'Done')
+        )
+        cache.set(
+            'core.user.{}.company.{}.notifications.unread'.format(
+                self.user.pk, self.company.pk
+            ), 5
+        )
+
+        Notification.objects.reconcile_unread_counts()
+        self.assertEqual(self.get_count(), 1)
+
+    def test_reconcile_all_read(self):
+        self.user.add_notification(
+            self.company, Link, self.link, (LEVEL_SUCCESS, 'Done')
+        )
+        self.user.notification_set.update(date_read=timezone.now())
+        cache.set(
+            'core.user.{}.company.{}.notifications.unread'.format(
+                self.user.pk, self.company.pk
+            ), 5
+        )
+
+        Notification.objects.reconcile_unread_counts()
+        self.assertEqual(self.get_count(), 0)
+
+    def test_reconcile_batches(self):
+        key = 'core.user.{}.company.{}.notifications.unread'
+        cache.set(key.format(self.user.pk, self.company.pk), 3)
+
+        self.assertEqual(
+            Notification.objects.reconcile_unread_counts(batch_size=1), 1
+        )
+        self.assertIsNone(
+            cache.get(key.format(self.user.pk, self.company.pk))
+        )
+        # Counters missing from the cache are left to the next read.
+        self.assertIsNone(
+            cache.get(key.format(self.colaborator.pk, self.company.pk))
+        )
+        self.assertEqual(self.get_count(), 0)
+
+    def test_add_notifications(self):
+        responses = [(LEVEL_SUCCESS, 'Done {}'.format(i)) for i in range(12)]
+        responses.append((LEVEL_ERROR, 'Failed'))
+        ContentType.objects.get_for_model(Link)
+
+        with self.assertNumQueries(1):
+            notifications = self.user.add_notifications(
+                self.company, Link, self.link, responses
+            )
+
+        self.assertEqual(len(notifications), 2)
+        self.assertEqual(
+            self.user.notification_set.get(level=LEVEL_SUCCESS).content,
+            '12 results: Done 0'
+        )
+        self.assertEqual(self.get_count(), 2)
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+})
+class NotificationConsumerTestCase(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.company.domain = 'company.test'
+        self.company.save()
+
+    def get_communicator(self, user, host=b'company.test'):
+        communicator = WebsocketCommunicator(
+            NotificationConsumer, '/ws/notifications/',
+            headers=[(b'host', host)]
+        )
+        communicator.scope['user'] = user
+        return communicator
+
+    def assertRejected(self, user, host=b'company.test'):
+        async def connect():
+            communicator = self.get_communicator(user, host)
+            connected, code = await communicator.connect()
+            await communicator.disconnect()
+            return connected
+
+        self.assertFalse(async_to_sync(connect)())
+
+    def test_connect_rejected(self):
+        self.assertRejected(AnonymousUser())
+        self.assertRejected(self.user, host=b'unknown.test')
+
+        outsider = User.objects.create(
+            username='outsider', email='outsider@test.com', is_active=True
+        )
+        self.assertRejected(outsider)
+
+    def test_receive_notifications(self):
+        data = {'id': 'notification', 'content': 'Done'}
+
+        async def receive():
+            communicator = self.get_communicator(self.user)
+            connected, code = await communicator.connect()
+            self.assertTrue(connected)
+
+            await sync_to_async(publish_notifications)(
+                self.user.pk, self.company.pk, [data]
+            )
+            response = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return response
+
+        self.assertEqual(async_to_sync(receive)(), data)
+
+
+class JobTestCase(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            self.company.link_set.create(
+                destination='https://example.com/{}'.format(i)
+            )
+
+    def test_run_resumes(self):
+        job = Job.objects.create_job(
+            self.company, self.user, self.company.link_set.all(), 'delete',
+            chunk_size=2
+        )
+        self.assertEqual(job.chunks_total, 3)
+
+        chunk = job.jobchunk_set.first()
+        self.assertTrue(chunk.run())
+        self.assertTrue(chunk.run())
+        self.assertEqual(self.company.link_set.count(), 3)
+
+        job.run()
+        job.refresh_from_db()
+
+        self.assertEqual(job.chunks_done, 3)
+        self.assertIsNotNone(job.date_finish)
+        self.assertFalse(self.company.link_set.exists())
+        self.assertEqual(
+            self.user.notification_set.get().level, LEVEL_SUCCESS
+        )
+
+    def test_run_error(self):
+        link = self.company.link_set.first()
+        link.visit_set.create(ip_address='127.0.0.1')
+        job = Job.objects.create_job(
+            self.company, self.user, self.company.link_set.all(), 'delete',
+            chunk_size=2
+        )
+        failing = next(
+            chunk for chunk in job.jobchunk_set.all()
+            if str(link.pk) in chunk.object_id_list
+        )
+
+        with self.assertRaises(ProtectedError):
+            failing.run()
+
+        failing.refresh_from_db()
+        self.assertTrue(failing.error)
+        self.assertIsNone(failing.date_finish)
+
+        # Running out of retries doesn't close the job while other chunks
+        # are pending.
+        failing.set_failed()
+        failing.set_failed()
+        job.refresh_from_db()
+        self.assertEqual(job.chunks_failed, 1)
+        self.assertIsNone(job.date_finish)
+
+        job.run()
+        job.refresh_from_db()
+        self.assertEqual(job.chunks_done, 2)
+        self.assertIsNotNone(job.date_finish)
+        self.assertEqual(
+            self.company.link_set.count(), len(failing.object_id_list)
+        )
+        self.assertEqual(
+            self.user.notification_set.get().level, LEVEL_WARNING
+        )
+
+    def test_delete_all_view(self):
+        self.company.link_set.first().visit_set.create(
+            ip_address='127.0.0.1'
+        )
+        request = self.factory.post('/fake-path')
+        request._messages = default_storage(request)
+        request.company = self.company
+        request.user = self.user
+
+        response = LinkDeleteAllView.as_view()(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.company.link_set.count(), 1)
+        self.assertIsNotNone(Job.objects.get().date_finish)
+
+
+class ModelTaskTestCase(CoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.link = self.company.link_set.create(
+            destination='https://example.com/'
+        )
+
+    def test_get_task_action(self):
+        self.assertEqual(
+            get_task_action(Link, 'visit_create'), ('visit_create', )
+        )
+        with self.assertRaises(AttributeError):
+            get_task_action(Link, 'missing')
+
+    def test_model_task(self):
+        # One query to load the link with its company, then the insert of
+        # the visit and the update of the counters.
+        with self.assertNumQueries(3):
+            model_task(
+                Link, self.company.pk, 'visit_create', pk=self.link.pk,
+                data={'ip_address': '127.0.0.1'}
+            )
+
+        self.assertEqual(self.link.visit_set.count(), 1)
+
+    def test_model_task_snapshot(self):
+        snapshot = get_task_snapshot(self.link, ['company', 'destination'])
+
+        with self.assertNumQueries(2):
+            model_task(
+                Link, None, 'visit_create', pk=self.link.pk,
+                data={'ip_address': '127.0.0.1'}, snapshot=snapshot
+            )
+
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.total_visits, 1)
+
+    def test_submit_task(self):
+        kwargs = dict(
+            company_id=self.company.pk, task='visit_create', pk=self.link.pk,
+            data={'ip_address': '127.0.0.1'}
+        )
+        self.assertTrue(submit_task(link_task, **kwargs))
+        self.assertTrue(submit_task(link_task, **kwargs))
+        self.assertEqual(self.link.visit_set.count(), 2)
+
+        cache.add(get_task_lock_key(link_task.name, **kwargs), True)
+        self.assertFalse(submit_task(link_task, **kwargs))
+        self.assertEqual(self.link.visit_set.count(), 2)
+        cache.clear()
+
+    @override_settings(DEBUG=False)
+    def test_submit_task_publish_error(self):
+        kwargs = dict(
+            company_id=self.company.pk, task='visit_create', pk=self.link.pk,
+            data={'ip_address': '127.0.0.1'}
+        )
+        lock_key = get_task_lock_key(link_task.name, **kwargs)
+
+        with mock.patch.object(
+            link_task, 'apply_async', side_effect=OSError
+        ):
+            with self.assertRaises(OSError):
+                submit_task(link_task, **kwargs)
+        self.assertIsNone(cache.get(lock_key))
+
+    @override_settings(DEBUG=False)
+    def test_key_generate_submit(self):
+        self.user.is_active = False
+        self.user.save()
+
+        with mock.patch.object(user_task, 'apply_async') as apply_async:
+            self.assertTrue(self.user.key_generate())
+        kwargs = apply_async.call_args[1]['kwargs']
+        self.assertIsNone(kwargs['company_id'])
+        json.dumps(kwargs)
+        cache.clear()
+
+
+class QueueLatencyTestCase(TestCase):
+    def setUp(self):
+        reset_queue_latency('bulk')
+
+    def test_record_queue_latency(self):
+        record_queue_latency('bulk', 0.5)
+        record_queue_latency('bulk', 1.5)
+
+        self.assertEqual(
+            get_queue_latency('bulk'),
+            dict(count=2, average=1000, max=1500)
+        )
+
+        reset_queue_latency('bulk')
+        self.assertEqual(get_queue_latency('bulk')['count'], 0)
+
+
+class PreloadTemplatesTestCase(TestCase):
+    def test_preload_templates(self):
+        self.assertGreater(preload_templates(), 0)
@@ -1,3 +1,24 @@
+import csv
+import json
+import os
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http.request import split_domain_port
+from django.template import (
+    engines, TemplateDoesNotExist, TemplateSyntaxError
+)
+from django.template.utils import get_app_template_dirs
+
+
+class Echo:
+    """
+    File-like object handing back what is written, for ``csv.writer``.
+    """
+
+    def write(self, value):
+        return value
+
+
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
@@ -5,3 +26,64 @@ def get_client_ip(request):
     else:
         ip = request.META.get('REMOTE_ADDR')
     return ip
+
+
+def normalize_domain(host):
+    """
+    Return the canonical form of a host used to resolve companies: lower
+    case, without port, trailing dot or ``www.`` prefix.
+    """
+    domain, port = split_domain_port(host or '')
+    domain = domain.rstrip('.')
+
+    if domain.startswith('www.'):
+        domain = domain[4:]
+
+    return domain
+
+
+def preload_templates():
+    """
+    Compile every template once, so the cached loader of a new worker
+    serves them from the first request. Return how many were loaded.
+    """
+    total = 0
+    directories = get_app_template_dirs('templates')
+
+    for engine in engines.all():
+        for directory in list(engine.dirs) + list(directories):
+            for root, dirs, files in os.walk(directory):
+                for name in files:
+                    if not name.endswith(('.html', '.txt')):
+                        continue
+
+                    template_name = os.path.relpath(
+                        os.path.join(root, name), directory
+                    ).replace(os.sep, '/')
+
+                    try:
+                        engine.get_template(template_name)
+                    except (TemplateDoesNotExist, TemplateSyntaxError):
+                        continue
+                    total += 1
+
+    return total
+
+
+def stream_csv(fields, rows):
+    """
+    Yield ``rows`` as CSV lines, headed by ``fields``.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(fields, rows):
+    """
+    Yield ``rows`` as JSON objects keyed by ``fields``, one per line.
+    """
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + '\n'
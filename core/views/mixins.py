@@ -8,7 +8,12 @@ from django.utils.translation import ugettext_lazy as _
 from django.views.generic.edit import FormMixin
 
 
-from core.constants import ACTIONS, LEVEL_SUCCESS
+from core.constants import (
+    ACTIONS, JOB_CHUNK_SIZE, LEVEL_INFO, LEVEL_SUCCESS, QUEUE_BULK,
+    QUEUE_INTERACTIVE
+)
+from core.shortcuts import get_current_colaborator
+from core.tasks import get_task_snapshot, submit_task
 
 
 class CompanyRequiredMixin:
@@ -25,7 +30,7 @@ class CompanyRequiredMixin:
             return self.handle_no_permission()
         elif not user.is_authenticated:
             return self.handle_no_permission()
-        if not user.as_colaborator(request.company):
+        if not get_current_colaborator(request):
             return self.handle_no_permission()
 
         bypass_inactive = self.get_bypass_inactive()
@@ -150,6 +155,8 @@ class FilterMixin(CompanyQuerySetMixin):
 
 
 class ModelActionMixin(CompanyQuerySetMixin, FormMixin):
+    chunk_size = JOB_CHUNK_SIZE
+    chunked_action = None
     form_class = None
     model_action = None
     failure_message = _("An error has ocurred, try again later.")
@@ -157,6 +164,8 @@ class ModelActionMixin(CompanyQuerySetMixin, FormMixin):
     success_message = _("Action was performed successfully.")
     success_url = None
     task_module = None
+    task_queue = None
+    task_snapshot_fields = None
     template_name_suffix = '_action'
 
     def get(self, request, *args, **kwargs):
@@ -181,6 +190,12 @@ class ModelActionMixin(CompanyQuerySetMixin, FormMixin):
                 data.update({'formset': kwargs['form'].cleaned_data})
         return data
 
+    def get_chunk_size(self):
+        return self.chunk_size
+
+    def get_chunked_action(self):
+        return self.chunked_action
+
     def get_context_data(self, **kwargs):
         if 'action' not in kwargs:
             kwargs['action'] = self.get_model_action()
@@ -229,6 +244,18 @@ class ModelActionMixin(CompanyQuerySetMixin, FormMixin):
     def get_task_module(self):
         return self.task_module
 
+    def get_task_queue(self):
+        """
+        Actions on a single object are interactive, the ones on the whole
+        model go to the bulk queue.
+        """
+        if self.task_queue:
+            return self.task_queue
+        return QUEUE_INTERACTIVE if self.object else QUEUE_BULK
+
+    def get_task_snapshot_fields(self):
+        return self.task_snapshot_fields
+
     def post(self, request, *args, **kwargs):
         try:
             self.object = self.get_object()
@@ -262,6 +289,11 @@ class ModelActionMixin(CompanyQuerySetMixin, FormMixin):
         return to_json(kwargs)
 
     def run_action(self, form=None):
+        chunked_action = self.get_chunked_action()
+
+        if chunked_action and not self.object:
+            return self.run_chunked_action(chunked_action)
+
         model_action = self.get_model_action()
         entity = self.object or self.model
 
@@ -289,10 +321,6 @@ class ModelActionMixin(CompanyQuerySetMixin, FormMixin):
         task_name = '{}_task'.format(self.model.__name__.lower())
         task = getattr(task_module, task_name)
         kwargs = self.kwargs_to_json(kwargs)
-
-        if not settings.DEBUG:
-            task = getattr(task, 'delay')
-
         task_kwargs = {
             'company_id': self.request.company.id,
             'user_request_id': self.request.user.id,
@@ -302,14 +330,39 @@ class ModelActionMixin(CompanyQuerySetMixin, FormMixin):
         if self.object:
             task_kwargs.update({'pk': self.object.pk})
 
+            snapshot_fields = self.get_task_snapshot_fields()
+            if snapshot_fields:
+                task_kwargs.update({
+                    'snapshot': get_task_snapshot(self.object, snapshot_fields)
+                })
+
         if kwargs:
             task_kwargs.update({'data': kwargs})
 
-        task(**task_kwargs)
+        if not submit_task(task, self.get_task_queue(), **task_kwargs):
+            return LEVEL_INFO, _("This action is already in progress.")
+        return LEVEL_SUCCESS, _("You'll receive a notification soon")
+
+    def run_chunked_action(self, action):
+        """
+        Run ``action`` on every object of the queryset through a job, in
+        chunks that are committed and retried independently.
+        """
+        from core.models import Job
+
+        job = Job.objects.create_job(
+            company=self.request.company,
+            user=self.request.user,
+            queryset=self.get_queryset(),
+            action=action,
+            chunk_size=self.get_chunk_size(),
+        )
+        job.run()
         return LEVEL_SUCCESS, _("You'll receive a notification soon")
 
 
 class DeleteAllMixin(ModelActionMixin):
+    chunked_action = 'delete'
     model_action = 'delete_all'
     require_confirmation = True
     paginate_by = 1
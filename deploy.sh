@@ -56,7 +56,8 @@ python manage.py compilemessages --locale=es
 supervisorctl reread
 supervisorctl update
 supervisorctl restart myapp_gunicorn
-supervisorctl restart myapp_celery
+supervisorctl restart myapp_daphne
+supervisorctl restart myapp_celery_realtime myapp_celery_interactive myapp_celery_bulk
 supervisorctl restart myapp_beat
 
 # To enable access to Celery Flower
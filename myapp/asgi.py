@@ -2,6 +2,11 @@ import os
 import django
 from channels.routing import get_default_application
 
+import dotenv
+
+dotenv.read_dotenv(
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+)
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myapp.settings')
 django.setup()
@@ -1,6 +1,6 @@
 import os
 
-from myapp.settings import BASE_DIR, TIME_ZONE
+from myapp.settings import BASE_DIR, TEMPLATES, TIME_ZONE
 
 
 DEBUG = False
@@ -98,6 +98,18 @@ CACHES = {
 }
 
 
+# Templates
+# Compiled once per worker, see core.utils.preload_templates
+
+TEMPLATES[0]['APP_DIRS'] = False
+
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+
 # Security
 
 SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
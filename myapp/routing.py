@@ -1,6 +1,12 @@
-from channels.routing import ProtocolTypeRouter
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ProtocolTypeRouter, URLRouter
+
+from core.routing import websocket_urlpatterns
 
 
 application = ProtocolTypeRouter({
-    # Empty for now (http->django views is added by default)
+    # http->django views is added by default
+    'websocket': AuthMiddlewareStack(
+        URLRouter(websocket_urlpatterns)
+    ),
 })
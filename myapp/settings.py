@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     # Modules
     'boilerplate',
     'bootstrap4',
+    'channels',
     'corsheaders',
     'dal',
     'dal_select2',
@@ -208,6 +209,23 @@ BOOTSTRAP4 = {
 }
 
 
+# Celery
+# http://docs.celeryproject.org/en/latest/userguide/routing.html
+
+# Queues by priority class, each one consumed by its own worker (see
+# supervisor.conf): realtime for tracking, interactive for actions started
+# by a user and bulk for periodic and mass work.
+CELERY_TASK_DEFAULT_QUEUE = 'interactive'
+
+CELERY_TASK_ROUTES = {
+    'check_company': {'queue': 'bulk'},
+    'check_event': {'queue': 'bulk'},
+    'flush_visits': {'queue': 'realtime'},
+    'job_chunk_task': {'queue': 'bulk'},
+    'reconcile_notifications': {'queue': 'bulk'},
+}
+
+
 # CKEditor
 # https://github.com/django-ckeditor/django-ckeditor#plugins
 
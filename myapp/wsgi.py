@@ -1,5 +1,6 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 import dotenv
@@ -11,3 +12,7 @@ dotenv.read_dotenv(
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myapp.settings")
 
 application = get_wsgi_application()
+
+if not settings.DEBUG:
+    from core.utils import preload_templates
+    preload_templates()
@@ -5,21 +5,32 @@ from rest_framework.decorators import action
 
 from core import models as core
 from core.api.mixins import (
-    CompanyReadOnlyViewSet, CompanyViewSet, NestedReadOnlyViewset
+    CompanyReadOnlyViewSet, CompanyViewSet, ExportMixin,
+    NestedReadOnlyViewset
 )
+from core.api.pagination import KeysetPagination
 from core.constants import LEVEL_SUCCESS
 from panel.api import serializers, filters
 
 
-class EventViewSet(CompanyViewSet):
+class EventViewSet(ExportMixin, CompanyViewSet):
+    export_fields = (
+        'id', 'user', 'type', 'date_creation', 'date_start', 'date_finish',
+        'is_public', 'content'
+    )
     filter_class = filters.EventFilterSet
     model = core.Event
+    pagination_class = KeysetPagination
     permissions_required = 'core:view_event'
     queryset = model.objects.all()
     serializer_class = serializers.EventSerializer
 
 
-class LinkViewSet(NestedReadOnlyViewset):
+class LinkViewSet(ExportMixin, NestedReadOnlyViewset):
+    export_fields = (
+        'id', 'message', 'destination', 'date_creation', 'total_visits',
+        'date_first_visit', 'date_last_visit'
+    )
     model = core.Link
     parent_model = core.Message
     parent_relation_field = 'message'
@@ -28,15 +39,25 @@ class LinkViewSet(NestedReadOnlyViewset):
     serializer_class = serializers.LinkSerializer
 
 
-class MessageViewSet(CompanyReadOnlyViewSet):
+class MessageViewSet(ExportMixin, CompanyReadOnlyViewSet):
+    export_fields = (
+        'id', 'direction', 'from_email', 'to_email', 'subject',
+        'date_creation', 'date_send', 'date_read', 'date_fail'
+    )
     model = core.Message
+    pagination_class = KeysetPagination
     permission_required = 'core:view_message'
     queryset = model.objects.all()
 
 
-class NotificationViewSet(CompanyViewSet):
+class NotificationViewSet(ExportMixin, CompanyViewSet):
+    export_fields = (
+        'id', 'content_type', 'object_id', 'level', 'content',
+        'destination', 'date_creation', 'date_read'
+    )
     filter_class = filters.NotificationFilterSet
     model = core.Notification
+    pagination_class = KeysetPagination
     queryset = model.objects.all()
     bypass_permissions = True
     serializer_class = serializers.NotificationSerializer
@@ -63,6 +84,12 @@ class NotificationViewSet(CompanyViewSet):
             status=status.HTTP_202_ACCEPTED
         )
 
+    @action(methods=['get'], detail=False, url_path='unread-count')
+    def unread_count(self, request, *args, **kwargs):
+        return response.Response(dict(
+            count=request.user.notifications_unread_count(request.company)
+        ))
+
     @action(methods=['post'], detail=True, url_path='set-read')
     def set_read(self, request, *args, **kwargs):
         obj = self.get_object()
@@ -77,11 +104,13 @@ class NotificationViewSet(CompanyViewSet):
         )
 
 
-class VisitViewSet(NestedReadOnlyViewset):
+class VisitViewSet(ExportMixin, NestedReadOnlyViewset):
+    export_fields = ('id', 'link', 'ip_address', 'date_creation')
     company_field = 'link__company'
     model = core.Visit
     parent_model = core.Link
     parent_relation_field = 'link'
+    pagination_class = KeysetPagination
     permission_required = 'core:view_visit'
     queryset = model.objects.all()
     serializer_class = serializers.VisitSerializer
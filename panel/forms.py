@@ -8,7 +8,7 @@ from django.utils.http import urlsafe_base64_encode
 from django.utils.translation import ugettext_lazy as _
 
 from core import models as core
-from core.fields import MultipleChoiceField
+from core.fields import MultipleChoiceField, PermissionMultipleChoiceField
 from core.shortcuts import get_current_company
 from core.widgets import CheckboxSelectMultiple
 
@@ -126,8 +126,8 @@ def get_colaborator_form(company):
             queryset=company.role_set.all(),
             required=False
         )
-        permissions = forms.ModelMultipleChoiceField(
-            queryset=company.permission_queryset,
+        permissions = PermissionMultipleChoiceField(
+            company=company,
             required=False
         )
 
@@ -268,8 +268,8 @@ class LinkForm(forms.ModelForm):
 
 def get_role_form(company):
     class ModelForm(forms.ModelForm):
-        permissions = forms.ModelMultipleChoiceField(
-            queryset=company.permission_queryset,
+        permissions = PermissionMultipleChoiceField(
+            company=company,
             required=False,
         )
 
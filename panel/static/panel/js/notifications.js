@@ -6,6 +6,8 @@ angular
     $httpProvider.defaults.xsrfHeaderName = 'X-CSRFToken'
   }])
   .value('LANGUAGE', angular.element('html').attr('lang'))
+  .constant('SOCKET_RETRY', { delay: 1000, maxDelay: 30000, maxRetries: 8 })
+  .constant('POLL_INTERVAL', 60000)
   .factory('NotificationService', ['$http', 'LANGUAGE', function ($http, LANGUAGE) {
     return {
       list: function (url) {
@@ -20,6 +22,9 @@ angular
       },
       setRead: function (pk) {
         return $http.post(`/api/panel/notifications/${pk}/set-read/`)
+      },
+      unreadCount: function () {
+        return $http.get(`/api/panel/notifications/unread-count/`)
       }
     }
   }])
@@ -27,8 +32,77 @@ angular
     amMoment.changeLocale(LANGUAGE)
   }])
 
-  .controller('NotificationListController', ['$scope', 'NotificationService', function ($scope, NotificationService) {
+  .controller('NotificationListController', ['$scope', '$interval', '$window', 'NotificationService', 'POLL_INTERVAL', 'SOCKET_RETRY', function ($scope, $interval, $window, NotificationService, POLL_INTERVAL, SOCKET_RETRY) {
+    $scope.jobs = {}
     $scope.loading = true
+    $scope.unread = 0
+
+    var retries = 0
+
+    var poll = function () {
+      $interval(function () {
+        NotificationService
+          .unreadCount()
+          .then(function (response) {
+            $scope.unread = response.data.count
+          })
+      }, POLL_INTERVAL)
+    }
+
+    var connect = function () {
+      var scheme = $window.location.protocol === 'https:' ? 'wss://' : 'ws://'
+      var socket = new $window.WebSocket(scheme + $window.location.host + '/ws/notifications/')
+
+      socket.onopen = function () {
+        retries = 0
+      }
+      socket.onmessage = function (event) {
+        var notification = JSON.parse(event.data)
+
+        if (notification.type === 'job.progress') {
+          $scope.$apply(function () {
+            if (notification.is_finished) {
+              delete $scope.jobs[notification.id]
+            } else {
+              $scope.jobs[notification.id] = notification
+            }
+          })
+          return
+        }
+
+        notification.actions = { view: { url: notification.destination } }
+
+        $scope.$apply(function () {
+          $scope.unread = $scope.unread + 1
+          if ($scope.notificationList) {
+            $scope.notificationList.results.unshift(notification)
+          }
+        })
+      }
+      socket.onclose = function (event) {
+        // Rejected handshakes also close with 1006, so they can't be told
+        // apart from a dropped connection. Retry with an exponential backoff
+        // and fall back to polling the unread count once retries run out.
+        if (event.code === 1000) return
+
+        if (retries >= SOCKET_RETRY.maxRetries) {
+          poll()
+          return
+        }
+
+        var delay = Math.min(
+          SOCKET_RETRY.delay * Math.pow(2, retries), SOCKET_RETRY.maxDelay
+        )
+        retries = retries + 1
+        $window.setTimeout(connect, delay)
+      }
+    }
+
+    if ($window.WebSocket) {
+      connect()
+    } else {
+      poll()
+    }
 
     $scope.loadMore = function () {
       if ($scope.loading || !$scope.notificationList.next) return
@@ -50,6 +124,7 @@ angular
       NotificationService
         .setAllRead()
         .then(function () {
+          $scope.unread = 0
           $scope.loading = false
         })
     }
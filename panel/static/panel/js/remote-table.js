@@ -90,9 +90,11 @@ angular
           $scope.loading = false
           $scope.data = response.data
           $scope.status = response.status
-          // Set numPages
+          // Set numPages, keyset paginated lists have no count
           var count = $scope.data.count
-          if (count % 10 === 0) {
+          if (count === undefined) {
+            $scope.numPages = null
+          } else if (count % 10 === 0) {
             $scope.numPages = count / 10
           } else if (count < 10) {
             $scope.numPages = 1
@@ -136,6 +136,11 @@ urlpatterns += [
         views.InviteSendView.as_view(),
         name='invite_send'
     ),
+    path(
+        _('invites/send/'),
+        views.InviteSendAllView.as_view(),
+        name='invite_send_all'
+    ),
     # Link - links - link
     path(
         _('links/'),
@@ -147,6 +152,11 @@ urlpatterns += [
         views.LinkCreateView.as_view(),
         name='link_add'
     ),
+    path(
+        _('links/delete/'),
+        views.LinkDeleteAllView.as_view(),
+        name='link_delete_all'
+    ),
     path(
         _('links/<pk>/'),
         views.LinkDetailView.as_view(),
@@ -29,6 +29,7 @@ from panel.views.invite import (
     InviteCreateView,
     InviteDeleteView,
     InviteListView,
+    InviteSendAllView,
     InviteSendView
 )
 from panel.views.link import (
@@ -36,7 +37,8 @@ from panel.views.link import (
     LinkDetailView,
     LinkCreateView,
     LinkUpdateView,
-    LinkDeleteView
+    LinkDeleteView,
+    LinkDeleteAllView
 )
 from panel.views.message import (
     MessageDetailView,
@@ -88,12 +90,14 @@ __all__ = [
     'InviteCreateView',
     'InviteDeleteView',
     'InviteListView',
+    'InviteSendAllView',
     'InviteSendView',
     'LinkListView',
     'LinkDetailView',
     'LinkCreateView',
     'LinkUpdateView',
     'LinkDeleteView',
+    'LinkDeleteAllView',
     'MessageDetailView',
     'MessageFrameView',
     'MessageListView',
@@ -16,7 +16,7 @@ from panel import forms
 class InviteListView(
     ActionListMixin, CompanyQuerySetMixin, ListView
 ):
-    action_list = ('add', )
+    action_list = ('add', 'send_all')
     model = Invite
     paginate_by = 30
     permission_required = 'core:view_invite'
@@ -67,3 +67,21 @@ class InviteSendView(
             'host': self.request.get_host()
         })
         return kwargs
+
+
+class InviteSendAllView(
+    ModelActionMixin, ListView
+):
+    model_action = 'objects.send_pending'
+    model = Invite
+    permission_required = 'core:send_invite'
+    success_url = reverse_lazy('panel:invite_list')
+    task_module = tasks
+
+    def get_action_kwargs(self, **kwargs):
+        kwargs = super().get_action_kwargs(**kwargs)
+        kwargs.update({
+            'scheme': self.request.scheme,
+            'host': self.request.get_host()
+        })
+        return kwargs
@@ -9,12 +9,14 @@ from boilerplate.mixins import (
 )
 
 from core.models import Link
-from core.views.mixins import CompanyCreateMixin, CompanyQuerySetMixin
+from core.views.mixins import (
+    CompanyCreateMixin, CompanyQuerySetMixin, DeleteAllMixin
+)
 from panel import forms
 
 
 class LinkListView(CompanyQuerySetMixin, ActionListMixin, ListView):
-    action_list = ('add', )
+    action_list = ('add', 'delete_all')
     model = Link
     paginate_by = 30
     permission_required = 'core:view_link'
@@ -60,3 +62,14 @@ class LinkDeleteView(CompanyQuerySetMixin, DeleteMessageMixin, DeleteView):
     def get_queryset(self):
         qs = super().get_queryset()
         return qs.filter(message__isnull=True, visit_set__isnull=True)
+
+
+class LinkDeleteAllView(DeleteAllMixin, ListView):
+    model = Link
+    permission_required = 'core:delete_link'
+    success_url = reverse_lazy('panel:link_list')
+    template_name = 'panel/link/link_action.html'
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        return qs.filter(message__isnull=True, visit__isnull=True)
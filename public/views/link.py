@@ -2,8 +2,7 @@ from django.conf import settings
 from django.http import HttpResponse
 from django.views.generic import DetailView
 
-from core import tasks
-from core.models import Link
+from core.models import Link, Visit
 from core.utils import get_client_ip
 
 
@@ -20,17 +19,12 @@ class LinkDetailView(DetailView):
     def get(self, request, *args, **kwargs):
         obj = self.get_object()
         ip = get_client_ip(request)
-        task = tasks.link_task
 
-        if not settings.DEBUG:
-            task = task.delay
+        if settings.DEBUG:
+            obj.visit_create(ip_address=ip)
+        else:
+            Visit.objects.buffer(obj.pk, ip)
 
-        task(
-            company_id=obj.company.id,
-            task='visit_create',
-            pk=obj.pk,
-            data={'ip_address': ip}
-        )
         response = HttpResponse("", status=301)
         response['Location'] = obj.destination
         return response
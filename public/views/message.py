@@ -1,14 +1,26 @@
+import base64
+
+from django.core.exceptions import ValidationError
 from django.http import HttpResponse
-from django.views.generic import DetailView
+from django.utils.cache import patch_cache_control
+from django.views.generic import View
 
-from core.constants import PIXEL_GIF_DATA
+from core.constants import PIXEL_CACHE_TIMEOUT, PIXEL_GIF_DATA
 from core.models import Message
 
 
-class MessagePixelView(DetailView):
-    model = Message
+PIXEL_GIF = base64.b64decode(PIXEL_GIF_DATA)
+
+
+class MessagePixelView(View):
+    def get(self, request, pk, *args, **kwargs):
+        try:
+            Message.objects.mark_read(pk)
+        except ValidationError:
+            pass
 
-    def get(self, *args, **kwargs):
-        self.object = self.get_object()
-        self.object.set_read()
-        return HttpResponse(PIXEL_GIF_DATA, content_type='image/gif')
+        response = HttpResponse(PIXEL_GIF, content_type='image/gif')
+        patch_cache_control(
+            response, private=True, max_age=PIXEL_CACHE_TIMEOUT
+        )
+        return response